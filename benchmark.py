@@ -0,0 +1,351 @@
+import argparse
+import contextlib
+import glob
+import html
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import requests
+
+import spider
+import spider_paper
+from html_archive import HtmlArchive
+
+# --- 配置區 ---
+SITE_FANOUT = 6 # 每個合成頁面的子頁面數
+SITE_DEPTH = 4 # 合成網站的深度（根頁面為 0）
+PDF_EVERY = 3 # 每隔幾個頁面放一個獨立的 PDF 連結
+TARGET_EVERY = 10 # 每隔幾個頁面連到共同的目標 PDF
+TARGET_PATH = '/files/target.pdf'
+PAPERS_PER_PAGE = 50 # 合成列表頁每頁的論文數
+LISTING_PAGES = 20
+PAPER_FIXTURES = '*_ncu_papers_selenium_full_authors.json' # 合成列表頁用的論文資料
+BENCH_ORG_ID = 'bench'
+BENCH_YEAR = 2024
+EMPTY_LISTING = '<!DOCTYPE html><html><body><ul class="list-results"></ul></body></html>'
+
+# --- 合成網站 ---
+def build_site(fanout=SITE_FANOUT, depth=SITE_DEPTH, pdf_every=PDF_EVERY, target_every=TARGET_EVERY):
+    """
+    產生 {路徑: HTML} 的樹狀網站：每頁連到子頁面、上一層與首頁，
+    路徑不帶結尾 /（spider.normalize_url 會去掉結尾 /），
+    部分頁面附上獨立 PDF 或共同的 TARGET_PATH。返回 (pages, 連到目標的頁面路徑)。
+    """
+    pages = {}
+    linking = []
+    frontier = [('/', '/')]
+    for level in range(depth + 1):
+        next_frontier = []
+        for path, parent in frontier:
+            links = [parent, '/']
+            if level < depth:
+                for i in range(fanout):
+                    child = f"{path.rstrip('/')}/{i}"
+                    links.append(child)
+                    next_frontier.append((child, path))
+            number = len(pages)
+            if number % pdf_every == 0:
+                links.append(f"/files/doc{number}.pdf")
+            if number % target_every == 0:
+                links.append(TARGET_PATH)
+                linking.append(path)
+            body = ''.join(f'<li><a href="{href}">連結 {href}</a></li>' for href in links)
+            pages[path] = (
+                f'<!DOCTYPE html><html><head><title>{path}</title></head>'
+                f'<body><h1>頁面 {path}</h1><p>{"內容 " * 50}</p><ul>{body}</ul></body></html>'
+            )
+        frontier = next_frontier
+    return pages, linking
+
+def load_fixture_papers(pattern=PAPER_FIXTURES):
+    papers = []
+    for path in sorted(glob.glob(pattern)):
+        with open(path, 'r', encoding='utf-8') as f:
+            papers.extend(json.load(f))
+    return papers
+
+def render_paper(paper):
+    """把一筆 {'title', 'authors'} 還原成 Pure 列表頁的 li.list-result-item 區塊"""
+    parts = [f'<h3 class="title"><a href="/zh/publications/x" rel="ContributionToBookAnthology">'
+             f'<span>{html.escape(paper["title"] or "")}</span></a></h3>']
+    for author in paper['authors']:
+        if isinstance(author, dict):
+            parts.append(f'<a rel="Person" href="{html.escape(urlparse(author["url"]).path)}" class="link person">'
+                         f'<span>{html.escape(author["name"])}</span></a>, ')
+        else:
+            parts.append(f'{html.escape(author)}, ')
+    parts.append('<span class="date">2024</span>')
+    return (
+        '<li class="list-result-item"><div class="result-container">'
+        f'<div class="rendering rendering_researchoutput rendering_short">{"".join(parts)}</div>'
+        '</div></li>'
+    )
+
+def build_listing(papers, per_page=PAPERS_PER_PAGE, pages=LISTING_PAGES):
+    """以已提交的論文 JSON 合成列表頁，最後多一頁空白頁讓爬取自然停止"""
+    listing = []
+    for page_num in range(pages):
+        chunk = [papers[(page_num * per_page + i) % len(papers)] for i in range(per_page)]
+        items = ''.join(render_paper(paper) for paper in chunk)
+        listing.append(f'<!DOCTYPE html><html><head><title>Research output</title></head><body>'
+                       f'<ul class="list-results">{items}</ul></body></html>')
+    listing.append(EMPTY_LISTING)
+    return listing
+
+def load_archived_listing(archive_dir):
+    """使用 HtmlArchive 中保存的真實列表頁（取第一個列表最近一次完整的抓取）"""
+    archive = HtmlArchive(archive_dir)
+    listings = []
+    with open(archive.manifest_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                listing = json.loads(line)['listing']
+                if listing not in listings:
+                    listings.append(listing)
+    return [archive.get(entry['sha256']) for entry in archive.pages(listings[0])]
+
+# --- 本機伺服器 ---
+class FixtureServer:
+    """在背景執行緒提供合成網站與列表頁，latency 秒模擬網路延遲"""
+    def __init__(self, site, listing, latency=0.0):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1' # keep-alive，與真實伺服器一樣重用連線
+
+            def handle(self):
+                try:
+                    super().handle()
+                except ConnectionError:
+                    pass # 客戶端提前關閉串流連線，不影響量測
+
+            def do_HEAD(self):
+                self.respond(send_body=False)
+
+            def do_GET(self):
+                self.respond(send_body=True)
+
+            def respond(self, send_body):
+                if server.latency:
+                    time.sleep(server.latency)
+                body, content_type = server.lookup(self.path)
+                self.send_response(200 if body is not None else 404)
+                body = body if body is not None else b'not found'
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                if send_body:
+                    self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.site = {path: page.encode('utf-8') for path, page in site.items()}
+        self.listing = [page.encode('utf-8') for page in listing]
+        self.latency = latency
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def lookup(self, raw_path):
+        parsed = urlparse(raw_path)
+        if parsed.path.endswith('.pdf'):
+            return b'%PDF-1.4\n%%EOF\n', 'application/pdf'
+        if parsed.path.startswith('/zh/publications/'):
+            page_num = int(parse_qs(parsed.query).get('page', ['0'])[0])
+            if page_num < len(self.listing):
+                return self.listing[page_num], 'text/html; charset=utf-8'
+            # 封存的瀏覽器抓取通常沒有最後的空白頁（翻到底時是超時），超出範圍一律回空列表
+            return EMPTY_LISTING.encode('utf-8'), 'text/html; charset=utf-8'
+        return self.site.get(parsed.path.rstrip('/') or '/'), 'text/html; charset=utf-8'
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+# --- 統計 ---
+def percentile(values, q):
+    """線性內插的百分位數，values 為空時返回 None"""
+    if not values:
+        return None
+    values = sorted(values)
+    pos = (len(values) - 1) * q / 100
+    low = int(pos)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (pos - low)
+
+def latency_summary(latencies):
+    return {f"p{q}_ms": round(percentile(latencies, q) * 1000, 3) if latencies else None for q in (50, 90, 99)}
+
+@contextlib.contextmanager
+def timed_calls(module, name, latencies):
+    """暫時包裝 module.name，記錄每次呼叫的耗時（秒）"""
+    original = getattr(module, name)
+
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return original(*args, **kwargs)
+        finally:
+            latencies.append(time.perf_counter() - start)
+
+    setattr(module, name, wrapper)
+    try:
+        yield
+    finally:
+        setattr(module, name, original)
+
+@contextlib.contextmanager
+def measure(result):
+    """
+    量測區塊的牆鐘時間與 tracemalloc 峰值記憶體，寫入 result。
+    tracemalloc 本身會拖慢執行，跨 commit 比較時數字一致即可，不代表實際速度。
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        result['seconds'] = round(time.perf_counter() - start, 4)
+        result['peak_memory_bytes'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+@contextlib.contextmanager
+def quiet():
+    """爬蟲逐頁 print，量測時丟棄輸出，避免終端機速度影響結果"""
+    with open(os.devnull, 'w', encoding='utf-8') as sink, contextlib.redirect_stdout(sink):
+        yield
+
+# --- 基準測試 ---
+def bench_crawl(server, expected, workers=spider.HTTP_WORKERS, max_depth=SITE_DEPTH):
+    """以 http 引擎對合成網站執行 find_pages_linking_to_file_selenium"""
+    result = {'workers': workers, 'max_depth': max_depth}
+    latencies = []
+    with measure(result), timed_calls(spider, 'fetch_links', latencies), quiet():
+        found, failed = spider.find_pages_linking_to_file_selenium(
+            f"{server.base_url}/", f"{server.base_url}{TARGET_PATH}", max_depth=max_depth, engine="http",
+            workers=workers, per_host=workers, min_interval=0,
+        )
+    result['pages'] = len(latencies)
+    result['pages_per_sec'] = round(len(latencies) / result['seconds'], 2)
+    result['latency'] = latency_summary(latencies)
+    result['stages'] = spider.METRICS.to_dict()['stages']
+    result['found'] = len(found)
+    result['failed'] = len(failed)
+    # 正確性檢查：速度變快但結果不同的改動不算數；比較排序後的串列，重複回報的頁面也算錯
+    result['correct'] = sorted(urlparse(url).path or '/' for url in found) == sorted(expected)
+    return result
+
+def bench_listing(server, workdir):
+    """抓取列表頁（spider_paper 的 HTTP 接手路徑）、離線解析並寫入 JSONL"""
+    start_url = f"{server.base_url}/zh/publications/?organisationIds={BENCH_ORG_ID}&publicationYear={BENCH_YEAR}"
+    session = requests.Session()
+    result = {'stopped': 'empty_page'}
+    fetch_latencies = []
+    parse_seconds = 0.0
+    writer = spider_paper.JsonlWriter(os.path.join(workdir, 'bench.jsonl'))
+    spider_paper.METRICS.reset()
+    with measure(result), quiet():
+        page_num = 0
+        while True:
+            url = spider_paper.page_url(start_url, page_num)
+            start = time.perf_counter()
+            try:
+                html_text = spider_paper.fetch_listing_http(session, url)
+            except requests.RequestException as e:
+                result['stopped'] = f"http_error: {e}"
+                break
+            fetch_latencies.append(time.perf_counter() - start)
+            if html_text is None: # 封存中的挑戰頁等
+                result['stopped'] = 'challenge_page'
+                break
+            start = time.perf_counter()
+            papers = spider_paper.parse_page_html(html_text, url)
+            parse_seconds += time.perf_counter() - start
+            if not papers:
+                break
+            writer.write_page(papers)
+            page_num += 1
+    writer.close()
+    result['pages'] = page_num
+    result['papers'] = writer.count
+    result['pages_per_sec'] = round(len(fetch_latencies) / result['seconds'], 2)
+    result['latency'] = latency_summary(fetch_latencies)
+    result['stages'] = spider_paper.METRICS.to_dict()['stages']
+    result['parse_seconds'] = round(parse_seconds, 4)
+    result['parse_ms_per_paper'] = round(parse_seconds * 1000 / writer.count, 4) if writer.count else None
+    return result
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description='以本機假網站量測 spider.py 與 spider_paper.py 的速度')
+    parser.add_argument('--fanout', type=int, default=SITE_FANOUT)
+    parser.add_argument('--depth', type=int, default=SITE_DEPTH)
+    parser.add_argument('--pdf-every', type=int, default=PDF_EVERY)
+    parser.add_argument('--workers', type=int, default=spider.HTTP_WORKERS)
+    parser.add_argument('--latency', type=float, default=0.0, help='每個請求額外延遲的秒數，模擬真實網路')
+    parser.add_argument('--listing-pages', type=int, default=LISTING_PAGES)
+    parser.add_argument('--papers-per-page', type=int, default=PAPERS_PER_PAGE)
+    parser.add_argument('--archive', help='改用這個 HtmlArchive 目錄中保存的真實列表頁')
+    parser.add_argument('--only', choices=('crawl', 'listing'), help='只跑其中一項')
+    parser.add_argument('--output', help='把結果 JSON 寫入這個檔案（預設只輸出到 stdout）')
+    args = parser.parse_args()
+
+    site, linking = build_site(args.fanout, args.depth, args.pdf_every)
+    if args.archive:
+        listing = load_archived_listing(args.archive)
+        if not listing:
+            parser.error(f"{args.archive} 中沒有完整抓取到最後一頁的列表")
+    else:
+        listing = build_listing(load_fixture_papers(), args.papers_per_page, args.listing_pages)
+
+    report = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'timestamp': time.time(),
+        'site': {'pages': len(site), 'fanout': args.fanout, 'depth': args.depth, 'pdf_every': args.pdf_every,
+                 'latency': args.latency},
+    }
+    with FixtureServer(site, listing, args.latency) as server, tempfile.TemporaryDirectory() as workdir:
+        if args.only != 'listing':
+            report['crawl'] = bench_crawl(server, linking, args.workers, args.depth)
+        if args.only != 'crawl':
+            report['listing'] = bench_listing(server, workdir)
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    return 0 if report.get('crawl', {}).get('correct', True) else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
+
+# =========== 使用範例 ===========
+# python benchmark.py --output bench_before.json
+# python benchmark.py --fanout 8 --depth 4 --latency 0.02 --workers 32
+# python benchmark.py --only listing --archive html_archive
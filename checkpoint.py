@@ -0,0 +1,23 @@
+import json
+import os
+
+def save_checkpoint(path, state):
+    """原子寫入檢查點：先寫暫存檔再 os.replace，寫到一半當掉也不會留下損壞的檔案"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+def load_checkpoint(path):
+    """讀取檢查點，不存在時返回 None"""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def clear_checkpoint(path):
+    """爬取正常完成後刪除檢查點，避免下次誤用"""
+    if os.path.exists(path):
+        os.remove(path)
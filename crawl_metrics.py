@@ -0,0 +1,128 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+class RunMetrics:
+    """
+    一次爬取的分段計時與計數器。stage() 累計每個階段的次數、總秒數與最長一次，
+    count() 記錄事件數；結束時 summary() 列出時間花在哪裡，write() 匯出 JSON 或 Prometheus 文字格式。
+    可在多個工作執行緒中共用；並行時各階段總和可能超過牆鐘時間。
+    """
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started_at = time.time()
+            self._start = time.perf_counter()
+            self.stages = {}  # stage -> [calls, total_seconds, max_seconds]
+            self.counters = {}
+
+    def _record(self, stage, seconds):
+        with self._lock:
+            entry = self.stages.setdefault(stage, [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+
+    @contextmanager
+    def stage(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._record(stage, time.perf_counter() - start)
+
+    def sleep(self, seconds, stage="sleep"):
+        """固定等待也算一個階段，才看得出 sleep 佔了多少時間"""
+        with self.stage(stage):
+            time.sleep(seconds)
+
+    def count(self, counter, n=1):
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + n
+
+    def elapsed(self):
+        return time.perf_counter() - self._start
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "name": self.name,
+                "started_at": self.started_at,
+                "wall_seconds": round(self.elapsed(), 6),
+                "stages": {
+                    stage: {"calls": calls, "total_seconds": round(total, 6), "max_seconds": round(longest, 6)}
+                    for stage, (calls, total, longest) in self.stages.items()
+                },
+                "counters": dict(self.counters),
+            }
+
+    def merge(self, data):
+        """併入另一個 to_dict() 的結果（例如分片子進程寫出的檔案）"""
+        with self._lock:
+            for stage, values in data["stages"].items():
+                entry = self.stages.setdefault(stage, [0, 0.0, 0.0])
+                entry[0] += values["calls"]
+                entry[1] += values["total_seconds"]
+                entry[2] = max(entry[2], values["max_seconds"])
+            for counter, n in data["counters"].items():
+                self.counters[counter] = self.counters.get(counter, 0) + n
+
+    def summary(self):
+        data = self.to_dict()
+        wall = data["wall_seconds"]
+        lines = [f"⏱️ {self.name}: {wall:.1f}s wall clock"]
+        lines.append(f"  {'stage':<22}{'calls':>8}{'total s':>11}{'avg ms':>10}{'max ms':>10}{'% wall':>8}")
+        for stage, values in sorted(data["stages"].items(), key=lambda item: -item[1]["total_seconds"]):
+            calls, total = values["calls"], values["total_seconds"]
+            lines.append(
+                f"  {stage:<22}{calls:>8}{total:>11.2f}{total * 1000 / calls:>10.1f}"
+                f"{values['max_seconds'] * 1000:>10.1f}{(total * 100 / wall if wall else 0):>7.1f}%"
+            )
+        if data["counters"]:
+            lines.append("  " + ", ".join(f"{counter}={n}" for counter, n in sorted(data["counters"].items())))
+        return "\n".join(lines)
+
+    def to_prometheus(self):
+        data = self.to_dict()
+        prefix = self.name
+        lines = [
+            f"# HELP {prefix}_run_seconds Wall-clock duration of the run.",
+            f"# TYPE {prefix}_run_seconds gauge",
+            f"{prefix}_run_seconds {data['wall_seconds']}",
+            f"# HELP {prefix}_stage_seconds_total Seconds spent in each stage.",
+            f"# TYPE {prefix}_stage_seconds_total counter",
+        ]
+        lines += [f'{prefix}_stage_seconds_total{{stage="{stage}"}} {values["total_seconds"]}'
+                  for stage, values in sorted(data["stages"].items())]
+        lines += [f"# HELP {prefix}_stage_calls_total Number of times each stage ran.",
+                  f"# TYPE {prefix}_stage_calls_total counter"]
+        lines += [f'{prefix}_stage_calls_total{{stage="{stage}"}} {values["calls"]}'
+                  for stage, values in sorted(data["stages"].items())]
+        lines += [f"# HELP {prefix}_stage_max_seconds Longest single run of each stage.",
+                  f"# TYPE {prefix}_stage_max_seconds gauge"]
+        lines += [f'{prefix}_stage_max_seconds{{stage="{stage}"}} {values["max_seconds"]}'
+                  for stage, values in sorted(data["stages"].items())]
+        lines += [f"# HELP {prefix}_events_total Event counters.", f"# TYPE {prefix}_events_total counter"]
+        lines += [f'{prefix}_events_total{{event="{counter}"}} {n}' for counter, n in sorted(data["counters"].items())]
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """副檔名 .prom / .txt 寫 Prometheus 文字格式（node_exporter textfile），其他寫 JSON"""
+        if os.path.splitext(path)[1] in (".prom", ".txt"):
+            content = self.to_prometheus()
+        else:
+            content = json.dumps(self.to_dict(), ensure_ascii=False, indent=2) + "\n"
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+def load_metrics(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
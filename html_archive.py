@@ -0,0 +1,99 @@
+import gzip
+import hashlib
+import json
+import os
+import time
+
+ARCHIVE_DIR = 'html_archive'
+
+class HtmlArchive:
+    """
+    列表頁原始 HTML 的壓縮封存，以內容的 sha256 定址，相同內容只存一份。
+    objects/<前兩碼>/<sha256>.html.gz 存內容，manifest.jsonl 記錄每次抓取
+    （列表、頁碼、網址、run_id）。解析邏輯改了之後可以從這裡重建輸出，不必重新爬取。
+    增量更新只抓前幾頁，這類抓取標記為 partial，不能單獨作為重建的基礎；
+    只有 mark_complete 記錄過「抓到最後一頁」的抓取才能作為重建的基礎。
+    """
+    def __init__(self, root=ARCHIVE_DIR):
+        self.root = root
+        self.manifest_path = os.path.join(root, 'manifest.jsonl')
+        os.makedirs(os.path.join(root, 'objects'), exist_ok=True)
+
+    def _object_path(self, digest):
+        return os.path.join(self.root, 'objects', digest[:2], f"{digest}.html.gz")
+
+    def put(self, html, url, listing, page_num, run_id, partial=False):
+        """保存一頁 HTML 並記入 manifest，返回內容的 sha256；partial=True 表示只抓了部分頁面的增量更新"""
+        data = html.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with gzip.open(tmp_path, 'wb', compresslevel=9) as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+
+        entry = {
+            'listing': listing,
+            'page': page_num,
+            'url': url,
+            'sha256': digest,
+            'run_id': run_id,
+            'fetched_at': time.time(),
+        }
+        if partial:
+            entry['partial'] = True
+        # 單行一次寫入，多個分片進程同時追加也不會交錯
+        with open(self.manifest_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        return digest
+
+    def mark_complete(self, listing, run_id):
+        """記錄這次抓取一路翻到了最後一頁（空頁）；中途逾時或出錯而停止的抓取不會有這筆記錄"""
+        entry = {'listing': listing, 'run_id': run_id, 'complete': True, 'fetched_at': time.time()}
+        with open(self.manifest_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    def get(self, digest):
+        with gzip.open(self._object_path(digest), 'rb') as f:
+            return f.read().decode('utf-8')
+
+    def runs(self, listing):
+        """
+        某個列表從最近一次完整抓取（有 mark_complete 記錄）開始的所有抓取，依 run_id 排序，
+        每個元素為 (run_id, partial, 依頁碼排序的頁面)；之後的 partial 抓取要依序合併上去。
+        沒有完整抓取時返回空串列。
+        """
+        if not os.path.exists(self.manifest_path):
+            return []
+        runs = {}
+        partial_runs = set()
+        complete_runs = set()
+        with open(self.manifest_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if entry['listing'] != listing:
+                    continue
+                if entry.get('complete'):
+                    complete_runs.add(entry['run_id'])
+                else:
+                    # 同一頁重抓時以後寫入的為準
+                    runs.setdefault(entry['run_id'], {})[entry['page']] = entry
+                    if entry.get('partial'):
+                        partial_runs.add(entry['run_id'])
+        run_ids = sorted(runs)
+        complete = [run_id for run_id in run_ids if run_id in complete_runs and run_id not in partial_runs]
+        if not complete:
+            return []
+        # 之後中途停止的完整抓取只有前幾頁，和 partial 一樣依序合併
+        run_ids = run_ids[run_ids.index(complete[-1]):]
+        return [(run_id, run_id in partial_runs, [runs[run_id][page] for page in sorted(runs[run_id])])
+                for run_id in run_ids]
+
+    def pages(self, listing):
+        """某個列表最近一次完整抓取（同一個 run_id，含 --resume 接續的部分）的頁面，依頁碼排序"""
+        runs = self.runs(listing)
+        return runs[0][2] if runs else []
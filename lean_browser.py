@@ -0,0 +1,37 @@
+# 兩支爬蟲只讀 DOM 文字與連結，圖片、字型、樣式表與分析腳本都是多餘的下載
+LEAN_CHROME_ARGS = [
+    "--blink-settings=imagesEnabled=false",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--disable-notifications",
+    "--mute-audio",
+    "--disable-features=Translate,MediaRouter,OptimizationHints",
+]
+
+# 以 CDP 在網路層封鎖；不要封鎖 challenges.cloudflare.com，否則過不了 Cloudflare 檢查
+BLOCKED_URL_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico", "*.bmp",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.css",
+    "*.mp4", "*.webm", "*.mp3",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+    "*facebook.net*", "*hotjar.com*", "*clarity.ms*", "*addthis.com*", "*sharethis.com*",
+    "*fonts.googleapis.com*", "*fonts.gstatic.com*",
+]
+
+def apply_lean_options(options):
+    """
+    在 ChromeOptions 上加入精簡設定（selenium 與 undetected_chromedriver 的 options 都適用）。
+    只用命令列參數，不設 prefs：undetected_chromedriver 會把 prefs 寫進用戶資料目錄的 Preferences，
+    之後不加 --lean 的執行也會繼續停用圖片。
+    """
+    for arg in LEAN_CHROME_ARGS:
+        options.add_argument(arg)
+
+def block_resources(driver):
+    """瀏覽器啟動後透過 CDP 封鎖圖片、字型、樣式表與第三方追蹤網域"""
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
@@ -0,0 +1,85 @@
+import sqlite3
+import time
+
+LINK_INDEX_PATH = "link_index.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    depth INTEGER,
+    crawled_at REAL
+);
+CREATE TABLE IF NOT EXISTS links (
+    source TEXT NOT NULL,
+    target TEXT NOT NULL,
+    PRIMARY KEY (source, target)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS links_by_target ON links (target, source);
+CREATE TABLE IF NOT EXISTS resources (
+    url TEXT PRIMARY KEY,
+    depth INTEGER
+);
+"""
+
+class LinkIndex:
+    """
+    爬蟲得到的 頁面 -> 外連網址 圖，存在本機 SQLite。
+    網址在存入前已由 spider.normalize_url 正規化（並去除結尾 /），查詢時也要用同樣的形式。
+    以 target 建索引，「哪些頁面連到 X」不需要重新爬站就能在毫秒內回答。
+    """
+    def __init__(self, path=LINK_INDEX_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def record_page(self, url, depth, links):
+        """寫入（或覆蓋）一個頁面的所有外連"""
+        self.conn.execute(
+            "INSERT OR REPLACE INTO pages (url, depth, crawled_at) VALUES (?, ?, ?)",
+            (url, depth, time.time()),
+        )
+        self.conn.execute("DELETE FROM links WHERE source = ?", (url,))
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO links (source, target) VALUES (?, ?)",
+            ((url, target) for target in links),
+        )
+
+    def record_resource(self, url, depth):
+        """記錄不含連結、沒有抓取的檔案（PDF、圖片等），它們是連結圖的葉節點"""
+        self.conn.execute("INSERT OR IGNORE INTO resources (url, depth) VALUES (?, ?)", (url, depth))
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def pages_linking_to(self, target):
+        rows = self.conn.execute("SELECT source FROM links WHERE target = ? ORDER BY source", (target,))
+        return [source for (source,) in rows]
+
+    def pages_linking_to_many(self, targets):
+        """一次查詢多個目標，回傳 {target: [pages]}"""
+        return {target: self.pages_linking_to(target) for target in targets}
+
+    def pages_linking_to_prefix(self, prefix):
+        """查詢所有以 prefix 開頭的目標（例如某個 /Files/ 目錄），回傳 {target: [pages]}"""
+        # 用範圍條件而不是 LIKE，才能走 links_by_target 索引
+        rows = self.conn.execute(
+            "SELECT target, source FROM links WHERE target >= ? AND target < ? ORDER BY target, source",
+            (prefix, prefix + "\U0010ffff"),
+        )
+        result = {}
+        for target, source in rows:
+            result.setdefault(target, []).append(source)
+        return result
+
+    def page_count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
@@ -0,0 +1,86 @@
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from collections import namedtuple
+
+PAGE_CACHE_PATH = "page_cache.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    body BLOB,
+    links TEXT,
+    fetched_at REAL
+);
+"""
+
+# links 為 None 代表該頁需要 JS 渲染，連結要由 Selenium 抓
+CacheEntry = namedtuple("CacheEntry", ["etag", "last_modified", "links"])
+
+class PageCache:
+    """
+    重複爬站用的本機頁面快取：保存頁面內容（zlib 壓縮）、ETag/Last-Modified 與已抽出的連結。
+    下次爬站以條件式請求驗證，伺服器回 304 時直接沿用快取的連結，不傳輸內容也不重新解析。
+    多個工作執行緒共用，所有存取都經過同一把鎖。
+    """
+    def __init__(self, path=PAGE_CACHE_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def get(self, url):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT etag, last_modified, links FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, links = row
+        return CacheEntry(etag, last_modified, json.loads(links))
+
+    def validators(self, entry):
+        """條件式請求要帶的標頭"""
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def store(self, url, etag, last_modified, body, links):
+        """只有帶 ETag 或 Last-Modified 的回應才值得存，否則下次也無法驗證"""
+        if not etag and not last_modified:
+            return
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO pages (url, etag, last_modified, body, links, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, etag, last_modified, zlib.compress(body) if body else None, json.dumps(links), time.time()),
+            )
+
+    def update_links(self, url, links):
+        """需要 JS 渲染的頁面由 Selenium 抓到連結後補存，下次 304 時就不必再開瀏覽器"""
+        with self._lock:
+            self.conn.execute("UPDATE pages SET links = ? WHERE url = ?", (json.dumps(links), url))
+
+    def body(self, url):
+        with self._lock:
+            row = self.conn.execute("SELECT body FROM pages WHERE url = ?", (url,)).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return zlib.decompress(row[0])
+
+    def commit(self):
+        with self._lock:
+            self.conn.commit()
+
+    def close(self):
+        with self._lock:
+            self.conn.commit()
+            self.conn.close()
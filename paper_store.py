@@ -0,0 +1,223 @@
+import argparse
+import json
+import os
+import re
+import sqlite3
+import unicodedata
+from urllib.parse import urlparse, parse_qs
+
+PAPER_STORE_PATH = 'ncu_papers.sqlite'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS papers (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    norm_title TEXT NOT NULL UNIQUE,
+    authors_json TEXT
+);
+CREATE TABLE IF NOT EXISTS paper_years (
+    paper_id INTEGER NOT NULL REFERENCES papers (id),
+    year INTEGER NOT NULL,
+    PRIMARY KEY (paper_id, year)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS paper_years_by_year ON paper_years (year, paper_id);
+CREATE TABLE IF NOT EXISTS persons (
+    url TEXT PRIMARY KEY,
+    name TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS persons_by_name ON persons (name);
+CREATE TABLE IF NOT EXISTS authorship (
+    paper_id INTEGER NOT NULL REFERENCES papers (id),
+    person_url TEXT NOT NULL REFERENCES persons (url),
+    PRIMARY KEY (paper_id, person_url)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS authorship_by_person ON authorship (person_url, paper_id);
+"""
+
+def normalize_title(title):
+    """跨年度去重用的標題鍵：NFKC、忽略大小寫、標點與空白只當分隔"""
+    title = unicodedata.normalize('NFKC', title or '').casefold()
+    return ' '.join(re.findall(r'\w+', title))
+
+def year_from_filename(path):
+    """111_ncu_papers_*.json 這類檔名以民國年開頭，換算成西元年"""
+    match = re.match(r'(\d{3,4})_', os.path.basename(path))
+    if not match:
+        return None
+    year = int(match.group(1))
+    return year + 1911 if year < 1911 else year
+
+def year_from_url(url):
+    """從列表網址的 publicationYear 參數取得年度"""
+    years = parse_qs(urlparse(url).query).get('publicationYear')
+    return int(years[0]) if years else None
+
+class PaperStore:
+    """
+    合併各年度 spider_paper.py 輸出的 SQLite 論文庫。
+    papers 以正規化標題去重，persons 以 /persons/ 網址為鍵，authorship 連接兩者；
+    依教授、年度、共同作者的查詢都走索引，不需要掃描 JSON。
+    """
+    def __init__(self, path=PAPER_STORE_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def _paper_id(self, title, authors=None):
+        norm_title = normalize_title(title)
+        if not norm_title:
+            return None
+        self.conn.execute(
+            'INSERT OR IGNORE INTO papers (title, norm_title) VALUES (?, ?)', (title, norm_title)
+        )
+        if authors is not None:
+            self.conn.execute(
+                'UPDATE papers SET authors_json = ? WHERE norm_title = ?',
+                (json.dumps(authors, ensure_ascii=False), norm_title),
+            )
+        return self.conn.execute('SELECT id FROM papers WHERE norm_title = ?', (norm_title,)).fetchone()[0]
+
+    def _add_author(self, paper_id, url, name):
+        self.conn.execute('INSERT OR IGNORE INTO persons (url, name) VALUES (?, ?)', (url, name))
+        self.conn.execute(
+            'INSERT OR IGNORE INTO authorship (paper_id, person_url) VALUES (?, ?)', (paper_id, url)
+        )
+
+    def ingest_papers(self, papers, year=None):
+        """寫入 {'title', 'authors'} 記錄（*_selenium_full_authors.json/.jsonl 的內容），返回處理筆數"""
+        count = 0
+        for paper in papers:
+            paper_id = self._paper_id(paper.get('title'), paper.get('authors', []))
+            if paper_id is None:
+                continue
+            if year is not None:
+                self.conn.execute(
+                    'INSERT OR IGNORE INTO paper_years (paper_id, year) VALUES (?, ?)', (paper_id, year)
+                )
+            for author in paper.get('authors', []):
+                if isinstance(author, dict) and 'url' in author:
+                    self._add_author(paper_id, author['url'], author['name'])
+            count += 1
+        self.conn.commit()
+        return count
+
+    def ingest_professor_index(self, prof_papers, year=None):
+        """寫入 *_by_professor.json（{url: {'name', 'papers': [title]}}），返回處理筆數"""
+        count = 0
+        for url, entry in prof_papers.items():
+            for title in entry['papers']:
+                paper_id = self._paper_id(title)
+                if paper_id is None:
+                    continue
+                if year is not None:
+                    self.conn.execute(
+                        'INSERT OR IGNORE INTO paper_years (paper_id, year) VALUES (?, ?)', (paper_id, year)
+                    )
+                self._add_author(paper_id, url, entry['name'])
+                count += 1
+        self.conn.commit()
+        return count
+
+    def ingest_file(self, path, year=None):
+        """依副檔名與內容判斷格式；year 未指定時從檔名的民國年推算"""
+        if year is None:
+            year = year_from_filename(path)
+        with open(path, 'r', encoding='utf-8') as f:
+            if path.endswith('.jsonl'):
+                return self.ingest_papers((json.loads(line) for line in f if line.strip()), year)
+            data = json.load(f)
+        if isinstance(data, dict):
+            return self.ingest_professor_index(data, year)
+        return self.ingest_papers(data, year)
+
+    def resolve_person(self, person):
+        """person 可以是 /persons/ 網址或姓名（部分相符），返回符合的 (url, name) 列表"""
+        if '/persons/' in person:
+            return self.conn.execute('SELECT url, name FROM persons WHERE url = ?', (person,)).fetchall()
+        return self.conn.execute(
+            'SELECT url, name FROM persons WHERE name LIKE ? ORDER BY name', (f'%{person}%',)
+        ).fetchall()
+
+    def papers_by_person(self, person_url, year=None):
+        """某位教授的論文，返回 (year, title) 列表"""
+        query = (
+            'SELECT y.year, p.title FROM authorship a '
+            'JOIN papers p ON p.id = a.paper_id '
+            'LEFT JOIN paper_years y ON y.paper_id = a.paper_id '
+            'WHERE a.person_url = ?'
+        )
+        params = [person_url]
+        if year is not None:
+            query += ' AND y.year = ?'
+            params.append(year)
+        return self.conn.execute(query + ' ORDER BY y.year, p.title', params).fetchall()
+
+    def papers_by_year(self, year):
+        return [title for (title,) in self.conn.execute(
+            'SELECT p.title FROM paper_years y JOIN papers p ON p.id = y.paper_id '
+            'WHERE y.year = ? ORDER BY p.title', (year,)
+        )]
+
+    def coauthors(self, person_url):
+        """與某位教授共同發表過的其他教授，返回 (url, name, 合著篇數)，依篇數排序"""
+        return self.conn.execute(
+            'SELECT o.person_url, s.name, COUNT(*) AS shared FROM authorship a '
+            'JOIN authorship o ON o.paper_id = a.paper_id AND o.person_url != a.person_url '
+            'JOIN persons s ON s.url = o.person_url '
+            'WHERE a.person_url = ? GROUP BY o.person_url ORDER BY shared DESC, s.name',
+            (person_url,),
+        ).fetchall()
+
+def main():
+    parser = argparse.ArgumentParser(description='查詢合併各年度的論文庫')
+    parser.add_argument('--db', default=PAPER_STORE_PATH)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    ingest_parser = subparsers.add_parser('ingest', help='匯入 spider_paper.py 的輸出（.json / .jsonl）')
+    ingest_parser.add_argument('files', nargs='+')
+    ingest_parser.add_argument('--year', type=int, help='西元年；未指定時從檔名的民國年推算')
+
+    professor_parser = subparsers.add_parser('professor', help='某位教授各年度的論文')
+    professor_parser.add_argument('person', help='/persons/ 網址或姓名')
+    professor_parser.add_argument('--year', type=int)
+
+    year_parser = subparsers.add_parser('year', help='某年度的所有論文')
+    year_parser.add_argument('year', type=int)
+
+    coauthor_parser = subparsers.add_parser('coauthors', help='某位教授的共同作者')
+    coauthor_parser.add_argument('person', help='/persons/ 網址或姓名')
+
+    args = parser.parse_args()
+    with PaperStore(args.db) as store:
+        if args.command == 'ingest':
+            for path in args.files:
+                count = store.ingest_file(path, args.year)
+                print(f"已匯入 {path}: {count} 筆")
+        elif args.command == 'year':
+            for title in store.papers_by_year(args.year):
+                print(title)
+        else:
+            people = store.resolve_person(args.person)
+            if not people:
+                print(f"找不到教授: {args.person}")
+            for url, name in people:
+                print(f"\n{name} ({url})")
+                if args.command == 'professor':
+                    for year, title in store.papers_by_person(url, args.year):
+                        print(f"  [{year}] {title}")
+                else:
+                    for other_url, other_name, shared in store.coauthors(url):
+                        print(f"  {other_name} ({other_url}): {shared} 篇")
+
+if __name__ == '__main__':
+    main()
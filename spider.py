@@ -3,78 +3,595 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.service import Service
 from selenium.common.exceptions import WebDriverException
-from bs4 import BeautifulSoup
+from html.parser import HTMLParser
 from urllib.parse import urljoin, quote, unquote, urlparse
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from requests.adapters import HTTPAdapter
+from link_index import LinkIndex, LINK_INDEX_PATH
+from page_cache import PageCache
+from checkpoint import save_checkpoint, load_checkpoint, clear_checkpoint
+from lean_browser import apply_lean_options, block_resources
+from crawl_metrics import RunMetrics
+import requests
+import argparse
+import base64
+import functools
+import hashlib
+import heapq
+import itertools
+import math
+import threading
 import time
 
+# --- 配置 ---
+CHROMEDRIVER_PATH = "chromedriver.exe"
+HTTP_WORKERS = 16  # 同時進行的 HTTP 連線數
+HTTP_TIMEOUT = 15
+SELENIUM_WORKERS = 4  # 同時開啟的 Chrome 數量
+PER_HOST_CONCURRENCY = 8  # 同一主機同時進行的請求上限
+MIN_REQUEST_INTERVAL = 0.1  # 同一主機兩次請求之間的最小間隔（秒）
+SEEN_CAPACITY = 1_000_000  # compact 模式下 BloomFilter 預計容納的網址數
+SEEN_ERROR_RATE = 0.001  # compact 模式下誤判為「已見過」的機率
+CRAWL_CHECKPOINT_PATH = "crawl_checkpoint.json"
+CRAWL_METRICS_PATH = "crawl_metrics.json"  # .prom 結尾則寫 Prometheus 文字格式
+CHECKPOINT_EVERY = 50  # 每處理幾個頁面寫一次檢查點（每層結束時也會寫）
+NORMALIZE_CACHE_SIZE = 65536  # encode_url 的 LRU 快取大小，導覽列等共用連結只編碼一次
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0 Safari/537.36"
+# 依副檔名判斷不含連結的資源（PDF、Office 文件、圖片、壓縮檔…），這些網址只記錄、不抓取
+RESOURCE_EXTENSIONS = {
+    ".pdf", ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx", ".odt", ".ods", ".odp", ".rtf", ".txt", ".csv",
+    ".zip", ".rar", ".7z", ".gz", ".tar", ".jpg", ".jpeg", ".png", ".gif", ".bmp", ".svg", ".webp", ".ico",
+    ".mp3", ".mp4", ".avi", ".mov", ".wmv", ".exe", ".msi", ".iso", ".xml", ".css", ".js", ".json",
+}
+PAGE_EXTENSIONS = {"", ".html", ".htm", ".shtml", ".php", ".asp", ".aspx", ".jsp", ".cfm"}
+# 這些路徑下沒有副檔名的網址多半是檔案下載，先用 HEAD 確認
+DOWNLOAD_PATH_HINTS = ("/files/", "/download", "/attachment", "/getfile")
+# <noscript> 內出現這些字樣，代表頁面內容要靠 JS 才會出現
+JS_MARKERS = ("enable javascript", "requires javascript", "javascript is disabled", "啟用javascript", "開啟javascript")
+
+METRICS = RunMetrics("spider")  # 各階段耗時與事件計數，工作執行緒共用
+
 def normalize_url(base_url, href):
     """補完整 URL，處理中文/特殊字元編碼"""
-    joined_url = urljoin(base_url, href)
+    # urljoin 的結果依頁面而異，不快取；合併後的絕對網址在各頁之間重複，編碼步驟以它為鍵快取
+    return encode_url(urljoin(base_url, href))
+
+@functools.lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def encode_url(joined_url):
     joined_url = unquote(joined_url)
     final_url = quote(joined_url, safe="/:?&=%#")
     return final_url
 
-def find_pages_linking_to_file_selenium(root_url, target_file_url, max_depth=3):
-    visited = set()
-    to_visit = [(root_url, 0)]
-    found_on_pages = []
-    failed_links = []
-
-    # 初始化 Selenium
+def create_chrome_driver(lean=False):
+    """初始化 headless Chrome，只在 HTTP 抓不到內容時才會用到；lean=True 時封鎖圖片、字型、樣式表與追蹤腳本"""
     options = Options()
     options.add_argument("--headless")
     # options.add_argument("--disable-gpu")
     options.add_argument("--no-sandbox")
-    driver = webdriver.Chrome(service=Service("chromedriver.exe"), options=options)
+    if lean:
+        apply_lean_options(options)
+    driver = webdriver.Chrome(service=Service(CHROMEDRIVER_PATH), options=options)
+    if lean:
+        block_resources(driver)
+    return driver
 
-    # 統一去除最後 /
-    target_file_url = target_file_url.rstrip("/")
+class BloomFilter:
+    """
+    固定大小的機率型集合：見過的網址一定判斷為見過，
+    沒見過的網址有 error_rate 的機率被誤判為見過（該頁會被略過）。
+    """
+    def __init__(self, capacity=SEEN_CAPACITY, error_rate=SEEN_ERROR_RATE):
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, item):
+        # double hashing：由一次 blake2b 的兩半推出 num_hashes 個位置
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, item):
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, item):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    def to_state(self):
+        return {"num_bits": self.num_bits, "num_hashes": self.num_hashes,
+                "bits": base64.b64encode(bytes(self.bits)).decode("ascii")}
+
+    @classmethod
+    def from_state(cls, state):
+        bloom = cls.__new__(cls)
+        bloom.num_bits = state["num_bits"]
+        bloom.num_hashes = state["num_hashes"]
+        bloom.bits = bytearray(base64.b64decode(state["bits"]))
+        return bloom
+
+class CrawlFrontier:
+    """
+    廣度優先的待爬佇列：加入時就去重，依深度由淺到深取出，並記錄每個網址已知的最淺深度。
+    同一網址若之後從更淺的路徑被找到，會以較淺的深度重新排入，舊的項目在取出時略過。
+    compact=True 時改用 BloomFilter 記錄見過的網址，記憶體固定，但不再保留每個網址的深度。
+    """
+    def __init__(self, max_depth, compact=False, capacity=SEEN_CAPACITY, error_rate=SEEN_ERROR_RATE):
+        self.max_depth = max_depth
+        self.depths = None if compact else {}
+        self.seen = BloomFilter(capacity, error_rate) if compact else None
+        self._heap = []
+        self._counter = itertools.count()  # 同深度內維持加入順序
+
+    def push(self, url, depth):
+        """加入網址；超過 max_depth 或已在同等/更淺深度見過則忽略，回傳是否真的加入"""
+        if depth > self.max_depth:
+            return False
+        if self.depths is not None:
+            known = self.depths.get(url)
+            if known is not None and known <= depth:
+                return False
+            self.depths[url] = depth
+        else:
+            if url in self.seen:
+                return False
+            self.seen.add(url)
+        heapq.heappush(self._heap, (depth, next(self._counter), url))
+        return True
+
+    def add_leaf(self, url, depth):
+        """記錄一個不需要抓取的網址（檔案），只標記為見過、不排入佇列；回傳是否第一次見到"""
+        if depth > self.max_depth:
+            return False
+        if self.depths is not None:
+            if url in self.depths:
+                return False
+            self.depths[url] = depth
+        else:
+            if url in self.seen:
+                return False
+            self.seen.add(url)
+        return True
+
+    def pop_level(self):
+        """取出目前最淺一層的所有網址，回傳 (depth, urls)"""
+        if not self._heap:
+            return None, []
+        depth = self._heap[0][0]
+        urls = []
+        while self._heap and self._heap[0][0] == depth:
+            _, _, url = heapq.heappop(self._heap)
+            if self.depths is not None and self.depths[url] != depth:
+                continue  # 已有更淺的路徑
+            urls.append(url)
+        return depth, urls
 
-    while to_visit:
-        current_url, depth = to_visit.pop()
-        if current_url in visited or depth > max_depth:
-            continue
+    def __len__(self):
+        return len(self._heap)
 
-        print(f"🔎 Crawling: {current_url} (depth: {depth})")
+    def to_state(self, pending_depth=None, pending=()):
+        """
+        序列化成可寫入 JSON 的 dict。
+        pending 是已由 pop_level 取出、但還沒處理完的同層網址，恢復後會最先被取出。
+        """
+        queue = [[pending_depth, url] for url in pending]
+        queue += [[depth, url] for depth, _, url in sorted(self._heap)]
+        state = {"max_depth": self.max_depth, "queue": queue}
+        if self.depths is not None:
+            state["depths"] = self.depths
+        else:
+            state["bloom"] = self.seen.to_state()
+        return state
+
+    @classmethod
+    def from_state(cls, state):
+        frontier = cls(state["max_depth"])
+        if "bloom" in state:
+            frontier.depths = None
+            frontier.seen = BloomFilter.from_state(state["bloom"])
+        else:
+            frontier.depths = dict(state["depths"])
+        for depth, url in state["queue"]:
+            heapq.heappush(frontier._heap, (depth, next(frontier._counter), url))
+        return frontier
+
+class DriverPool:
+    """
+    共用的 Chrome 實例池：第一次借用時才啟動，最多 size 個，用完歸還給下一個工作執行緒。
+    """
+    def __init__(self, size=SELENIUM_WORKERS, lean=False):
+        self.size = size
+        self.lean = lean
+        self._idle = []
+        self._drivers = []
+        self._starting = 0
+        self._available = threading.Condition()
+
+    def _acquire(self):
+        with self._available:
+            # 每次被喚醒都重新檢查：有閒置的就借用，還有名額就自己啟動；
+            # 別的執行緒啟動失敗時會釋出名額並喚醒這裡，不會永遠卡住
+            while not self._idle and len(self._drivers) + self._starting >= self.size:
+                self._available.wait()
+            if self._idle:
+                return self._idle.pop()
+            self._starting += 1
+        try:
+            with METRICS.stage("browser_start"):
+                driver = create_chrome_driver(self.lean)
+        except BaseException:
+            with self._available:
+                self._starting -= 1
+                self._available.notify()
+            raise
+        with self._available:
+            self._starting -= 1
+            self._drivers.append(driver)
+        return driver
+
+    def _release(self, driver):
+        with self._available:
+            self._idle.append(driver)
+            self._available.notify()
+
+    @contextmanager
+    def driver(self):
+        driver = self._acquire()
         try:
-            driver.get(current_url)
-            time.sleep(1)  # 給 JS 一點渲染時間
-            html = driver.page_source
-        except WebDriverException as e:
-            print(f"⚠️ Failed to fetch {current_url}: {e}")
-            failed_links.append(current_url)
-            continue
+            yield driver
+        finally:
+            self._release(driver)
+
+    def close(self):
+        for driver in self._drivers:
+            driver.quit()
+        self._drivers = []
+
+class HostThrottle:
+    """
+    每個主機的並行上限與最小請求間隔，不論開多少工作執行緒都不會過度請求學校伺服器。
+    """
+    def __init__(self, max_concurrency=PER_HOST_CONCURRENCY, min_interval=MIN_REQUEST_INTERVAL):
+        self.max_concurrency = max_concurrency
+        self.min_interval = min_interval
+        self._semaphores = {}
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            semaphore = self._semaphores.setdefault(host, threading.BoundedSemaphore(self.max_concurrency))
+        with METRICS.stage("throttle_wait"):
+            semaphore.acquire()
+            # 預約下一個可用的時間點，再睡到那個時間
+            with self._lock:
+                now = time.monotonic()
+                start = max(now, self._next_slot.get(host, now))
+                self._next_slot[host] = start + self.min_interval
+            if start > now:
+                time.sleep(start - now)
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+def create_http_session(pool_size=HTTP_WORKERS):
+    """建立 keep-alive 連線池，大小與並行數一致，避免連線被丟棄重建"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=1)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    return session
+
+class LinkExtractor(HTMLParser):
+    """
+    只抽 <a href> 的串流 tokenizer，不建 DOM 樹。
+    順便記錄判斷是否需要 JS 渲染所需的資訊：頁面上有沒有可見文字、<noscript> 的內容。
+    """
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.hrefs = []
+        self.has_text = False
+        self.noscript_text = []
+        self._skip_depth = 0  # 位於 <head>/<script>/<style> 內
+        self._noscript_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "a":
+            for name, value in attrs:
+                if name == "href" and value is not None:
+                    self.hrefs.append(value)
+                    break
+        elif tag in ("head", "script", "style", "template"):
+            self._skip_depth += 1
+        elif tag == "noscript":
+            self._noscript_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in ("head", "script", "style", "template"):
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag == "noscript":
+            self._noscript_depth = max(0, self._noscript_depth - 1)
+
+    def handle_data(self, data):
+        if self._noscript_depth:
+            self.noscript_text.append(data)
+        elif not self._skip_depth and not self.has_text and data.strip():
+            self.has_text = True
 
-        visited.add(current_url)
-        soup = BeautifulSoup(html, "html.parser")
+def parse_html(html):
+    extractor = LinkExtractor()
+    extractor.feed(html)
+    extractor.close()
+    return extractor
 
-        has_link_to_target = False
+def needs_js_rendering(page):
+    """判斷靜態 HTML 是否需要交給瀏覽器渲染：頁面沒有文字也沒有連結，或沒有任何連結且 <noscript> 要求開啟 JS"""
+    if page.hrefs:
+        return False
+    if not page.has_text:
+        return True
+    text = "".join(page.noscript_text).lower().replace(" ", "")
+    return any(marker.replace(" ", "") in text for marker in JS_MARKERS)
 
-        for a_tag in soup.find_all("a", href=True):
-            href = a_tag["href"]
-            full_url = normalize_url(current_url, href).rstrip("/")
+def extract_links(page, page_url):
+    return [normalize_url(page_url, href).rstrip("/") for href in page.hrefs]
 
-            # 是否指向目標檔案
-            if full_url == target_file_url:
-                has_link_to_target = True
+def same_site_check(root_url):
+    """預先算好根網址的 scheme://netloc，之後每個連結只需字串比對，不必再 urlparse"""
+    netloc = urlparse(root_url).netloc
+    prefixes = tuple(f"{scheme}://{netloc}" for scheme in ("http", "https"))
 
-            # 加入新的頁面（同主網域才會再深入）
-            if urlparse(full_url).netloc == urlparse(root_url).netloc and full_url not in visited:
-                to_visit.append((full_url, depth + 1))
+    def is_same_site(url):
+        for prefix in prefixes:
+            # 前綴之後必須是網址結尾或路徑/查詢的開頭，避免 ncu.edu.tw.evil.com 這類誤判
+            if url.startswith(prefix) and url[len(prefix):len(prefix) + 1] in ("", "/", "?", "#"):
+                return True
+        return False
+    return is_same_site
 
-        if has_link_to_target:
-            print(f"✅ Page linking to target: {current_url}")
-            found_on_pages.append(current_url)
+def classify_url(url):
+    """依網址判斷：'page' 要抓、'resource' 是檔案（只記錄不抓）、'unknown' 要先發 HEAD"""
+    path = unquote(urlparse(url).path).lower()
+    extension = posixpath.splitext(path)[1]
+    if extension in RESOURCE_EXTENSIONS:
+        return "resource"
+    if extension not in PAGE_EXTENSIONS:
+        return "unknown"
+    if not extension and any(hint in path for hint in DOWNLOAD_PATH_HINTS):
+        return "unknown"
+    return "page"
 
-    driver.quit()
+def head_content_type(session, url):
+    """以 HEAD 取得 Content-Type；伺服器不支援或失敗時返回 None（照常抓取）"""
+    try:
+        with METRICS.stage("http_head"):
+            response = session.head(url, allow_redirects=True, timeout=HTTP_TIMEOUT)
+    except requests.RequestException:
+        return None
+    if response.status_code >= 400:
+        return None
+    return response.headers.get("Content-Type")
+
+def fetch_links_http(session, url, cache=None):
+    """
+    以 HTTP 抓取頁面並抽出連結；非 HTML 資源沒有連結，需要 JS 渲染時回傳 None。
+    有 cache 時先帶 ETag/Last-Modified 做條件式請求，304 就直接回傳快取的連結。
+    """
+    entry = cache.get(url) if cache is not None else None
+    headers = cache.validators(entry) if cache is not None else {}
+    with METRICS.stage("http_request"):
+        response = session.get(url, headers=headers, timeout=HTTP_TIMEOUT, stream=True)
+    if response.status_code == 304 and entry is not None:
+        response.close()
+        METRICS.count("not_modified")
+        return entry.links
+    response.raise_for_status()
+
+    if "html" not in response.headers.get("Content-Type", "").lower():
+        response.close()  # stream=True：非 HTML 不下載內容
+        links = []
+        body = b""  # 不保存二進位檔內容
+    else:
+        with METRICS.stage("http_body"):
+            text = response.text
+        with METRICS.stage("parse"):
+            page = parse_html(text)
+            links = None if needs_js_rendering(page) else extract_links(page, url)
+        body = response.content
+    if cache is not None:
+        with METRICS.stage("cache_write"):
+            cache.store(url, response.headers.get("ETag"), response.headers.get("Last-Modified"), body, links)
+    return links
+
+def fetch_links_selenium(driver, url):
+    with METRICS.stage("selenium_navigate"):
+        driver.get(url)
+    METRICS.sleep(1, "selenium_render_wait")  # 給 JS 一點渲染時間
+    with METRICS.stage("selenium_page_source"):
+        html = driver.page_source
+    with METRICS.stage("parse"):
+        return extract_links(parse_html(html), url)
+
+def fetch_links(url, session, driver_pool, throttle, cache=None, engine="http"):
+    """
+    工作執行緒：副檔名無法判斷的網址先發 HEAD，不是 HTML 就返回 None（當作檔案葉節點，不抓取）；
+    否則先試 HTTP，需要 JS 渲染（或 engine="selenium"）時借一個 Chrome 來抓。
+    """
+    if classify_url(url) == "unknown":
+        with throttle.slot(url):
+            content_type = head_content_type(session, url)
+        if content_type and "html" not in content_type.lower():
+            return None
+    if engine == "http":
+        with throttle.slot(url):
+            links = fetch_links_http(session, url, cache)
+        if links is not None:
+            return links
+        print(f"🧭 Needs JS rendering, using Selenium: {url}")
+        METRICS.count("selenium_fallbacks")
+    with driver_pool.driver() as driver, throttle.slot(url):
+        links = fetch_links_selenium(driver, url)
+    if cache is not None:
+        cache.update_links(url, links)
+    return links
+
+def find_pages_linking_to_file_selenium(root_url, target_file_url, max_depth=3, engine="http", workers=HTTP_WORKERS,
+                                        browsers=SELENIUM_WORKERS, per_host=PER_HOST_CONCURRENCY,
+                                        min_interval=MIN_REQUEST_INTERVAL, compact_seen=False, index_path=None,
+                                        cache_path=None, checkpoint_path=None, resume=False, lean_browser=False,
+                                        metrics_path=None):
+    """
+    從 root_url 開始爬同網域頁面，找出連到 target_file_url 的頁面。
+    engine="http" 以連線池並行抓取靜態 HTML，只有需要 JS 渲染的頁面才交給 Selenium；
+    engine="selenium" 則全部用瀏覽器抓。
+    workers 個工作執行緒共用同一個 CrawlFrontier，最多開 browsers 個 Chrome，
+    並以 per_host / min_interval 限制對同一主機的請求。
+    頁面按深度分批抓取，每批結果依原順序處理，並行與否結果都相同。
+    compact_seen=True 時以 BloomFilter 記錄見過的網址，適合非常大的網站。
+    指定 index_path 時，每個頁面的全部外連都寫入 LinkIndex，之後可用 query_link_index 查任何目標；
+    此時 target_file_url 可為 None（只建索引）。
+    指定 cache_path 時使用 PageCache：重複爬站只發條件式請求，未變更的頁面沿用上次抽出的連結。
+    指定 checkpoint_path 時定期保存待爬佇列、已見網址與目前結果；resume=True 則從檢查點繼續。
+    lean_browser=True 時 Chrome 不載入圖片、字型、樣式表與追蹤腳本。
+    結束時印出各階段耗時（METRICS），指定 metrics_path 時另外匯出成檔案。
+    """
+    METRICS.reset()
+    found_on_pages = []
+    failed_links = []
+    leaf_count = 0  # 不抓取、只記錄的檔案數
+    # 起點與頁面上的連結用同樣方式正規化，否則根頁面會被當成另一個網址再抓一次
+    root_url = normalize_url(root_url, "").rstrip("/")
+
+    is_same_site = same_site_check(root_url)
+    session = create_http_session(workers)  # selenium 引擎也用它發 HEAD
+    driver_pool = DriverPool(browsers, lean_browser)  # 需要時才啟動 Chrome
+    throttle = HostThrottle(per_host, min_interval)
+    executor = ThreadPoolExecutor(max_workers=workers)
+    index = LinkIndex(index_path) if index_path else None
+    cache = PageCache(cache_path) if cache_path and engine == "http" else None
+    if cache_path and cache is None:
+        print(f"⚠️ Page cache {cache_path} ignored: only the http engine can revalidate pages")
+
+    # 統一去除最後 /
+    if target_file_url:
+        target_file_url = target_file_url.rstrip("/")
+
+    frontier = None
+    if resume and checkpoint_path:
+        state = load_checkpoint(checkpoint_path)
+        if state and state["root_url"] == root_url and state["target_file_url"] == target_file_url:
+            frontier = CrawlFrontier.from_state(state["frontier"])
+            frontier.max_depth = max_depth
+            found_on_pages = state["found_on_pages"]
+            failed_links = state["failed_links"]
+            leaf_count = state.get("leaf_count", 0)
+            print(f"♻️ Resuming from {checkpoint_path}: {len(frontier)} URLs queued, "
+                  f"{len(found_on_pages)} matches so far")
+        elif state:
+            print(f"⚠️ Checkpoint {checkpoint_path} is for a different crawl, starting over.")
+    if frontier is None:
+        frontier = CrawlFrontier(max_depth, compact=compact_seen)
+        frontier.push(root_url, 0)
+
+    def record_leaf(url, depth):
+        nonlocal leaf_count
+        leaf_count += 1
+        METRICS.count("leaves")
+        if index is not None:
+            index.record_resource(url, depth)
+
+    def write_checkpoint(depth, pending):
+        # 索引與快取先落盤，檢查點才不會比它們新
+        with METRICS.stage("checkpoint"):
+            if index is not None:
+                index.commit()
+            if cache is not None:
+                cache.commit()
+            if checkpoint_path:
+                save_checkpoint(checkpoint_path, {
+                    "root_url": root_url,
+                    "target_file_url": target_file_url,
+                    "frontier": frontier.to_state(depth, pending),
+                    "found_on_pages": found_on_pages,
+                    "failed_links": failed_links,
+                    "leaf_count": leaf_count,
+                })
+
+    try:
+        while frontier:
+            depth, level = frontier.pop_level()
+            futures = {}
+            for current_url in level:
+                print(f"🔎 Crawling: {current_url} (depth: {depth})")
+                futures[current_url] = executor.submit(fetch_links, current_url, session, driver_pool, throttle, cache,
+                                                       engine)
+
+            for i, current_url in enumerate(level, 1):
+                if i % CHECKPOINT_EVERY == 0:
+                    write_checkpoint(depth, level[i - 1:])
+                try:
+                    with METRICS.stage("wait_results"):  # 主執行緒等工作執行緒的時間
+                        links = futures[current_url].result()
+                except (requests.RequestException, WebDriverException) as e:
+                    print(f"⚠️ Failed to fetch {current_url}: {e}")
+                    failed_links.append(current_url)
+                    METRICS.count("failed")
+                    continue
+
+                if links is None:  # HEAD 顯示不是 HTML
+                    record_leaf(current_url, depth)
+                    continue
+
+                METRICS.count("pages")
+                if index is not None:
+                    with METRICS.stage("index_write"):
+                        index.record_page(current_url, depth, dict.fromkeys(links))
+
+                # 是否指向目標檔案
+                if target_file_url and target_file_url in links:
+                    print(f"✅ Page linking to target: {current_url}")
+                    found_on_pages.append(current_url)
+
+                # 加入新的頁面（同主網域才會再深入）；檔案只記錄為葉節點，不抓取
+                for full_url in links:
+                    if is_same_site(full_url):
+                        if classify_url(full_url) == "resource":
+                            if frontier.add_leaf(full_url, depth + 1):
+                                record_leaf(full_url, depth + 1)
+                        else:
+                            frontier.push(full_url, depth + 1)
+
+            write_checkpoint(depth, ())
+
+        if checkpoint_path:
+            clear_checkpoint(checkpoint_path)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        session.close()
+        driver_pool.close()
+        if index is not None:
+            index.close()
+        if cache is not None:
+            cache.close()
 
     # 結果
     print("\n✅✅ Finished!")
-    print("--- Pages that link to the target file ---")
-    if found_on_pages:
+    print(f"📄 {leaf_count} non-HTML resources recorded without fetching")
+    if not target_file_url:
+        print(f"🗂️ Link graph saved to {index_path}")
+    elif found_on_pages:
+        print("--- Pages that link to the target file ---")
         for page in found_on_pages:
             print(page)
     else:
+        print("--- Pages that link to the target file ---")
         print("⚠️ No pages found linking to the target file.")
 
     if failed_links:
@@ -82,10 +599,77 @@ def find_pages_linking_to_file_selenium(root_url, target_file_url, max_depth=3):
         for fail in failed_links:
             print(fail)
 
+    print()
+    print(METRICS.summary())
+    if metrics_path:
+        METRICS.write(metrics_path)
+        print(f"📊 Metrics written to {metrics_path}")
+
     return found_on_pages, failed_links
 
-# =========== 使用範例 ===========
-root_site = "https://ncu.edu.tw/rd/"
-target_file = "https://in.ncu.edu.tw/ncu7020/Files/Research/8.(%E7%A0%94%E7%99%BC%E6%9C%83%E5%BE%8C%E4%BF%AE%E6%AD%A3)-%E6%95%99%E5%B8%AB%E7%B8%BE%E5%84%AA%E5%B0%88%E5%88%A9%E5%8F%8A%E6%8A%80%E8%BD%89%E7%8D%8E%E5%8B%B5%E8%BE%A6%E6%B3%95.pdf"
+def query_link_index(targets=(), prefix=None, index_path=LINK_INDEX_PATH):
+    """
+    從已建好的 LinkIndex 查詢哪些頁面連到 targets（或所有以 prefix 開頭的網址），不重新爬站。
+    網址先用與爬蟲相同的方式正規化。回傳 {target: [pages]}。
+    """
+    with LinkIndex(index_path) as index:
+        result = index.pages_linking_to_many(normalize_url(target, "").rstrip("/") for target in targets)
+        if prefix:
+            result.update(index.pages_linking_to_prefix(normalize_url(prefix, "")))
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="找出連到指定檔案的頁面")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    crawl_parser = subparsers.add_parser("crawl", help="爬站（並可建立連結索引）")
+    crawl_parser.add_argument("root_url")
+    crawl_parser.add_argument("--target", help="要找的檔案網址")
+    crawl_parser.add_argument("--max-depth", type=int, default=10)
+    crawl_parser.add_argument("--engine", choices=("http", "selenium"), default="http")
+    crawl_parser.add_argument("--workers", type=int, default=HTTP_WORKERS)
+    crawl_parser.add_argument("--browsers", type=int, default=SELENIUM_WORKERS)
+    crawl_parser.add_argument("--compact-seen", action="store_true")
+    crawl_parser.add_argument("--index", help="把完整連結圖寫入這個 SQLite 檔")
+    crawl_parser.add_argument("--cache", help="頁面快取 SQLite 檔，重複爬站時以條件式請求驗證")
+    crawl_parser.add_argument("--checkpoint", default=CRAWL_CHECKPOINT_PATH, help="爬取進度檢查點檔案")
+    crawl_parser.add_argument("--resume", action="store_true", help="從檢查點繼續上次中斷的爬取")
+    crawl_parser.add_argument("--lean", action="store_true", help="Chrome 封鎖圖片、字型、樣式表與追蹤腳本")
+    crawl_parser.add_argument("--metrics", default=CRAWL_METRICS_PATH,
+                              help="各階段耗時的輸出檔（.json，或 .prom 為 Prometheus 文字格式）")
+
+    query_parser = subparsers.add_parser("query", help="從連結索引查詢，不重新爬站")
+    query_parser.add_argument("targets", nargs="*", help="目標檔案網址")
+    query_parser.add_argument("--prefix", help="查詢所有以此開頭的目標網址")
+    query_parser.add_argument("--index", default=LINK_INDEX_PATH)
 
-find_pages_linking_to_file_selenium(root_site, target_file, max_depth=10)
+    args = parser.parse_args()
+    if args.command == "crawl":
+        if not args.target and not args.index:
+            parser.error("crawl 需要 --target 或 --index")
+        if args.cache and args.engine == "selenium":
+            parser.error("--cache 只適用於 --engine http（瀏覽器抓取無法做條件式請求）")
+        find_pages_linking_to_file_selenium(
+            args.root_url, args.target, max_depth=args.max_depth, engine=args.engine,
+            workers=args.workers, browsers=args.browsers, compact_seen=args.compact_seen,
+            index_path=args.index, cache_path=args.cache,
+            checkpoint_path=args.checkpoint, resume=args.resume, lean_browser=args.lean,
+            metrics_path=args.metrics,
+        )
+    else:
+        if not args.targets and not args.prefix:
+            parser.error("query 需要至少一個目標網址或 --prefix")
+        for target, pages in query_link_index(args.targets, args.prefix, args.index).items():
+            print(f"\n🎯 {target}")
+            if pages:
+                for page in pages:
+                    print(f"  {page}")
+            else:
+                print("  ⚠️ No pages found linking to the target file.")
+
+# =========== 使用範例 ===========
+# python spider.py crawl https://ncu.edu.tw/rd/ --max-depth 10 --target "https://in.ncu.edu.tw/ncu7020/Files/Research/8.(%E7%A0%94%E7%99%BC%E6%9C%83%E5%BE%8C%E4%BF%AE%E6%AD%A3)-%E6%95%99%E5%B8%AB%E7%B8%BE%E5%84%AA%E5%B0%88%E5%88%A9%E5%8F%8A%E6%8A%80%E8%BD%89%E7%8D%8E%E5%8B%B5%E8%BE%A6%E6%B3%95.pdf"
+# python spider.py crawl https://ncu.edu.tw/rd/ --index link_index.sqlite
+# python spider.py query --index link_index.sqlite <檔案網址> --prefix https://in.ncu.edu.tw/ncu7020/Files/
+if __name__ == "__main__":
+    main()
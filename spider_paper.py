@@ -1,4 +1,7 @@
+import argparse
+import hashlib
 import json
+import shutil
 import time
 import undetected_chromedriver as uc
 from selenium.webdriver.common.by import By
@@ -7,22 +10,48 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException
 import os
 import re # 用於正則表達式處理作者字符串
+import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import urljoin
+from bs4 import BeautifulSoup, Comment
+from checkpoint import save_checkpoint, load_checkpoint, clear_checkpoint
+from paper_store import PaperStore, year_from_url, normalize_title
+from html_archive import HtmlArchive, ARCHIVE_DIR
+from lean_browser import apply_lean_options, block_resources
+from crawl_metrics import RunMetrics, load_metrics
 
 # --- 配置區 ---
-# START_URL = 'https://scholars.ncu.edu.tw/zh/publications/?organisationIds=3e96fdff-eb87-4166-8e98-56399da65648&nofollow=true&publicationYear=2022'
-# START_URL = 'https://scholars.ncu.edu.tw/zh/publications/?organisationIds=3e96fdff-eb87-4166-8e98-56399da65648&nofollow=true&publicationYear=2023'
-START_URL = 'https://scholars.ncu.edu.tw/zh/publications/?organisationIds=3e96fdff-eb87-4166-8e98-56399da65648&nofollow=true&publicationYear=2024'
+ORGANISATION_ID = '3e96fdff-eb87-4166-8e98-56399da65648'
+LISTING_URL_TEMPLATE = 'https://scholars.ncu.edu.tw/zh/publications/?organisationIds={org}&nofollow=true&publicationYear={year}'
+START_URL = LISTING_URL_TEMPLATE.format(org=ORGANISATION_ID, year=2024)
 OUTPUT_FILENAME = 'ncu_papers_selenium_full_authors.json' # 更新文件名
+JSONL_FILENAME = 'ncu_papers_selenium_full_authors.jsonl' # 逐頁追加的串流輸出，結束時再轉成 OUTPUT_FILENAME
+PROFESSOR_OUTPUT_FILENAME = 'ncu_papers_by_professor.json'
+CHECKPOINT_FILENAME = 'spider_paper_checkpoint.json' # 每完成一頁就更新，--resume 時從這裡繼續
+METRICS_FILENAME = 'spider_paper_metrics.json' # 各階段耗時；.prom 結尾則寫 Prometheus 文字格式
 WAIT_TIMEOUT = 45
 PAGE_LOAD_TIMEOUT = 120
 STABILITY_PAUSE_TIME = 3
-SCREENSHOT_DIR = 'screenshots'
+SCREENSHOT_ROOT = 'screenshots'
+SCREENSHOT_DIR = SCREENSHOT_ROOT # 分片進程改成 SCREENSHOT_ROOT 下各自的子目錄
+SHARD_DIR = 'shards' # 多年度/多單位分片的中間輸出
+SHARD_STARTUP_STAGGER = 10 # 各進程啟動瀏覽器的間隔秒數，避免同時修補 chromedriver 與同時觸發 Cloudflare
+SNAPSHOT_PARSING = True # True: 只讀一次 page_source，離線解析；False: 逐個元素走 WebDriver
+HTTP_FETCH_WORKERS = 4 # HTTP 接手模式下同時抓取的列表頁數
+HTTP_TIMEOUT = 30
+ARCHIVE_HTML = True # 每個列表頁的原始 HTML 壓縮保存到 ARCHIVE_DIR，供 --reparse 使用
+INCREMENTAL_STOP_PAGES = 2 # 增量模式下連續幾頁沒有新論文就停止翻頁
+LEAN_BROWSER = False # True: 封鎖圖片、字型、樣式表與追蹤腳本（見 lean_browser.py）；樣式表被封鎖時搭配 SNAPSHOT_PARSING 使用
+SCREENSHOT_ON_SUCCESS = True # False: 只在失敗時截圖
 
 HEADLESS_MODE = False
 USER_DATA_DIR = os.path.join(os.getcwd(), 'selenium_user_data')
 
+METRICS = RunMetrics('spider_paper') # 導航、等待、sleep、DOM 抽取、解析、輸出各花多少時間
+
 # --- 函數區 (與之前相同，略) ---
-def initialize_driver(headless=True, user_data_dir=None):
+def initialize_driver(headless=True, user_data_dir=None, lean=False):
     options = uc.ChromeOptions()
     if headless:
         options.add_argument("--headless=new")
@@ -39,30 +68,115 @@ def initialize_driver(headless=True, user_data_dir=None):
         options.add_argument(f"--user-data-dir={user_data_dir}")
         print(f"使用用戶資料目錄: {user_data_dir}")
 
+    if lean:
+        apply_lean_options(options)
+
     driver = uc.Chrome(options=options)
     driver.set_page_load_timeout(PAGE_LOAD_TIMEOUT)
+    if lean:
+        block_resources(driver)
+        print("精簡模式: 已封鎖圖片、字型、樣式表與追蹤腳本")
     return driver
 
-def take_screenshot(driver, name):
+def take_screenshot(driver, name, success=False):
+    if success and not SCREENSHOT_ON_SUCCESS:
+        return
     if not os.path.exists(SCREENSHOT_DIR):
         os.makedirs(SCREENSHOT_DIR)
     filepath = os.path.join(SCREENSHOT_DIR, f"{name}.png")
     try:
-        driver.save_screenshot(filepath)
+        with METRICS.stage('screenshot'):
+            driver.save_screenshot(filepath)
         print(f"截圖已保存: {filepath}")
     except Exception as e:
         print(f"保存截圖失敗: {e}")
 
+def is_challenge_page(html):
+    return "Just a moment..." in html or "Enable JavaScript and cookies to continue" in html
+
+def session_from_driver(driver, pool_size=HTTP_FETCH_WORKERS):
+    """
+    把已通過 Cloudflare 的瀏覽器 cookies 與 User-Agent 交給 requests.Session，
+    之後的列表頁以 keep-alive HTTP 抓取，不再經過瀏覽器渲染。
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    # cf_clearance 綁定 User-Agent，必須與瀏覽器一致（headless 的標記要拿掉）
+    user_agent = driver.execute_script("return navigator.userAgent;")
+    session.headers['User-Agent'] = user_agent.replace('HeadlessChrome', 'Chrome')
+    session.headers['Accept-Language'] = driver.execute_script("return navigator.languages.join(',');") or 'zh-TW'
+    for cookie in driver.get_cookies():
+        session.cookies.set(cookie['name'], cookie['value'], domain=cookie.get('domain'), path=cookie.get('path', '/'))
+    return session
+
+def fetch_listing_http(session, url):
+    """以 HTTP 抓取一頁列表；遇到 Cloudflare 挑戰時返回 None，交回瀏覽器處理"""
+    with METRICS.stage('http_fetch'):
+        response = session.get(url, timeout=HTTP_TIMEOUT)
+    if response.status_code in (403, 429, 503) or is_challenge_page(response.text):
+        METRICS.count('http_challenges')
+        return None
+    response.raise_for_status()
+    return response.text
+
+def load_listing_page(driver, url):
+    """以瀏覽器開啟列表頁並等待 Cloudflare 與論文列表；超時會拋出 TimeoutException"""
+    with METRICS.stage('navigate'):
+        driver.get(url)
+    wait_for_listing(driver)
+    METRICS.sleep(STABILITY_PAUSE_TIME, 'stability_sleep')
+    scroll_page(driver)
+
+def wait_for_listing(driver):
+    """等待 Cloudflare 挑戰結束與論文列表出現，兩段等待分開計時"""
+    with METRICS.stage('cloudflare_wait'):
+        WebDriverWait(driver, 60).until_not(EC.title_contains("Just a moment..."))
+        WebDriverWait(driver, 60).until_not(EC.presence_of_element_located((By.ID, "cf-wrapper")))
+    with METRICS.stage('list_wait'):
+        WebDriverWait(driver, WAIT_TIMEOUT).until(
+            EC.presence_of_element_located((By.CSS_SELECTOR, 'li.list-result-item'))
+        )
+
 def scroll_page(driver):
     print("模擬人類滾動行為...")
-    driver.execute_script("window.scrollTo(0, Math.random() * window.innerHeight);")
-    time.sleep(STABILITY_PAUSE_TIME)
-    driver.execute_script("window.scrollTo(0, document.body.scrollHeight / 2);")
-    time.sleep(STABILITY_PAUSE_TIME)
-    driver.execute_script("window.scrollTo(0, 0);")
-    time.sleep(STABILITY_PAUSE_TIME)
+    with METRICS.stage('scroll'):
+        driver.execute_script("window.scrollTo(0, Math.random() * window.innerHeight);")
+        time.sleep(STABILITY_PAUSE_TIME)
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight / 2);")
+        time.sleep(STABILITY_PAUSE_TIME)
+        driver.execute_script("window.scrollTo(0, 0);")
+        time.sleep(STABILITY_PAUSE_TIME)
     print("滾動模擬完成。")
 
+def split_unlinked_authors(full_authors_string, linked_author_names):
+    """
+    把剔除標題、日期與連結作者後剩下的文字拆成無連結作者列表。
+    WebDriver 與離線解析兩條路徑共用，確保輸出一致。
+    """
+    # 現在 full_authors_string 理論上只剩下無連結的作者名以及一些分隔符
+    # 我們需要將它拆分為個別的作者
+    # 假設無連結作者名之間用逗號分隔，且名稱後沒有其他非作者內容
+    # 例如: "Liang, K. W., Guo, Y. S., Wang, C. Y., Le, P. T., Putri, W. R., , Chang, P.-C. &amp; , "
+
+    # 先清除多餘的逗號和 " &amp; "，然後根據逗號分割
+    # 這一步可能需要針對實際輸出進行調試和優化
+    cleaned_authors_string = re.sub(r'(,\s*){2,}', ', ', full_authors_string) # 清理多餘逗號
+    cleaned_authors_string = cleaned_authors_string.replace('&amp;', '&').replace('&', ',').strip() # 將 & 視為分隔符
+
+    # 移除開頭或結尾可能的逗號
+    cleaned_authors_string = cleaned_authors_string.strip(',').strip()
+
+    # 分割成無連結作者
+    if not cleaned_authors_string:
+        return []
+    return [
+        author.strip()
+        for author in cleaned_authors_string.split(',')
+        if author.strip() and author.strip() not in linked_author_names
+    ]
+
 def parse_authors(block_elem, driver, title):
     """
     從論文區塊中解析所有作者，並區分有連結和無連結的作者。
@@ -185,52 +299,151 @@ def parse_authors(block_elem, driver, title):
         for name in linked_author_names:
             full_authors_string = full_authors_string.replace(name, '', 1).strip() # 只替換一次，避免重複姓名問題
 
-        # 現在 full_authors_string 理論上只剩下無連結的作者名以及一些分隔符
-        # 我們需要將它拆分為個別的作者，並將其添加到 all_authors
-        # 假設無連結作者名之間用逗號分隔，且名稱後沒有其他非作者內容
-        # 例如: "Liang, K. W., Guo, Y. S., Wang, C. Y., Le, P. T., Putri, W. R., , Chang, P.-C. &amp; , "
-        
-        # 先清除多餘的逗號和 " &amp; "，然後根據逗號分割
-        # 這一步可能需要針對實際輸出進行調試和優化
-        cleaned_authors_string = re.sub(r'(,\s*){2,}', ', ', full_authors_string) # 清理多餘逗號
-        cleaned_authors_string = cleaned_authors_string.replace('&amp;', '&').replace('&', ',').strip() # 將 & 視為分隔符
-        
-        # 移除開頭或結尾可能的逗號
-        cleaned_authors_string = cleaned_authors_string.strip(',').strip()
-
-        # 分割成無連結作者
-        if cleaned_authors_string:
-            no_link_authors = [
-                author.strip() 
-                for author in cleaned_authors_string.split(',') 
-                if author.strip() and author.strip() not in linked_author_names
-            ]
-            for author in no_link_authors:
-                all_authors.append(author) # 以字串形式添加無連結作者
+        # 剩下的文字拆成無連結作者，以字串形式添加到 all_authors
+        all_authors.extend(split_unlinked_authors(full_authors_string, linked_author_names))
 
     except Exception as e:
         print(f"解析作者時發生錯誤: {e}")
 
     return all_authors
 
+# --- 離線解析 (單次 page_source 快照) ---
+# 這些區塊元素在 WebDriver 的 .text 中會各自換行
+BLOCK_TAGS = {
+    'address', 'article', 'aside', 'blockquote', 'dd', 'div', 'dl', 'dt',
+    'fieldset', 'figcaption', 'figure', 'footer', 'form', 'h1', 'h2', 'h3',
+    'h4', 'h5', 'h6', 'header', 'hr', 'li', 'main', 'nav', 'ol', 'p', 'pre',
+    'section', 'table', 'tr', 'ul',
+}
+INVISIBLE_TAGS = {'script', 'style', 'noscript', 'template'}
+
+def rendered_text(elem):
+    """
+    模擬 WebDriver 的 element.text：區塊元素換行、行內空白壓縮成單一空格。
+    離線解析時用它取代 .text，讓字串替換邏輯與瀏覽器版本一致。
+    """
+    lines = ['']
+
+    def walk(node):
+        for child in node.children:
+            if isinstance(child, Comment):
+                continue
+            if isinstance(child, str):
+                lines[-1] += str(child)
+            elif child.name == 'br':
+                lines.append('')
+            elif child.name in INVISIBLE_TAGS:
+                continue
+            elif child.name in BLOCK_TAGS:
+                lines.append('')
+                walk(child)
+                lines.append('')
+            else:
+                walk(child)
+
+    walk(elem)
+    return '\n'.join(line for line in (' '.join(l.split()) for l in lines) if line)
+
+def parse_authors_html(block, title, base_url=''):
+    """
+    parse_authors 的離線版本：在 BeautifulSoup 的論文區塊上解析作者，不呼叫 WebDriver。
+    返回格式與 parse_authors 相同。
+    """
+    all_authors = []
+
+    try:
+        linked_author_names = []
+        for author_link in block.select('div.rendering a[rel="Person"][href*="/persons/"]'):
+            # 優先取 <a> 內 <span> 的文字，沒有則取 <a> 本身
+            author_span = author_link.find('span')
+            name = rendered_text(author_span if author_span is not None else author_link).strip()
+            # get_attribute('href') 回傳的是絕對網址，這裡以頁面網址補完整
+            url = urljoin(base_url, author_link.get('href', ''))
+            if name and url:
+                all_authors.append({"name": name, "url": url})
+                linked_author_names.append(name)
+
+        rendering_div = block.select_one('div.rendering.rendering_researchoutput')
+        if rendering_div is None:
+            raise NoSuchElementException("div.rendering.rendering_researchoutput")
+
+        full_authors_string = rendered_text(rendering_div)
 
-def scrape_page_data(driver, page_num):
+        # 剔除標題
+        if title:
+            full_authors_string = full_authors_string.replace(title, '', 1).strip()
+
+        # 剔除年份
+        date_span = rendering_div.select_one('span.date')
+        if date_span is not None:
+            full_authors_string = full_authors_string.replace(rendered_text(date_span).strip(), '', 1).strip()
+
+        # 剔除有連結的作者
+        for name in linked_author_names:
+            full_authors_string = full_authors_string.replace(name, '', 1).strip()
+
+        all_authors.extend(split_unlinked_authors(full_authors_string, linked_author_names))
+
+    except Exception as e:
+        print(f"解析作者時發生錯誤: {e}")
+
+    return all_authors
+
+def parse_page_html(html, base_url=''):
+    """
+    從一份列表頁 HTML 解析出所有論文，返回與 scrape_page_data 相同的 {'title', 'authors'} 記錄。
+    純 Python，不需要瀏覽器，可用於已保存的頁面。
+    """
+    with METRICS.stage('parse'):
+        soup = BeautifulSoup(html, 'html.parser')
+        data = []
+        for block in soup.select('li.list-result-item'):
+            title = None
+            title_elem = block.select_one('div.result-container h3 a')
+            if title_elem is not None:
+                title = rendered_text(title_elem).strip()
+
+            data.append({
+                'title': title,
+                'authors': parse_authors_html(block, title, base_url)
+            })
+    return data
+
+
+def scrape_page_data(driver, page_num, archive_page=None):
     data = []
     
     try:
-        WebDriverWait(driver, WAIT_TIMEOUT).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, 'li.list-result-item'))
-        )
-        time.sleep(STABILITY_PAUSE_TIME)
+        with METRICS.stage('list_wait'):
+            WebDriverWait(driver, WAIT_TIMEOUT).until(
+                EC.presence_of_element_located((By.CSS_SELECTOR, 'li.list-result-item'))
+            )
+        METRICS.sleep(STABILITY_PAUSE_TIME, 'stability_sleep')
         
-        if "Just a moment..." in driver.page_source or "Enable JavaScript and cookies to continue" in driver.page_source:
+        # 只取一次 page_source，Cloudflare 檢查與離線解析共用
+        with METRICS.stage('page_source'):
+            html = driver.page_source
+        if is_challenge_page(html):
+            METRICS.count('challenges')
             print(f"錯誤: 頁面 {page_num+1} 在等待後仍然是 Cloudflare 挑戰頁面。")
             take_screenshot(driver, f"page_{page_num}_cloudflare_after_wait")
             return []
 
-        paper_blocks = driver.find_elements(By.CSS_SELECTOR, 'li.list-result-item')
+        if archive_page is not None:
+            archive_page(html, driver.current_url)
+
+        if SNAPSHOT_PARSING:
+            data = parse_page_html(html, driver.current_url)
+            print(f"找到 {len(data)} 篇論文在當前頁面。")
+            take_screenshot(driver, f"page_{page_num}_after_load", success=True)
+            if not data:
+                print(f"警告: 雖然等待成功，但當前頁面 {page_num+1} 沒有找到論文區塊。")
+            return data
+
+        with METRICS.stage('dom_extract'):
+            paper_blocks = driver.find_elements(By.CSS_SELECTOR, 'li.list-result-item')
         print(f"找到 {len(paper_blocks)} 篇論文在當前頁面。")
-        take_screenshot(driver, f"page_{page_num}_after_load")
+        take_screenshot(driver, f"page_{page_num}_after_load", success=True)
 
         if not paper_blocks:
             print(f"警告: 雖然等待成功，但當前頁面 {page_num+1} 沒有找到論文區塊。")
@@ -241,13 +454,15 @@ def scrape_page_data(driver, page_num):
             all_authors_list = [] # 現在用這個列表儲存所有作者
 
             try:
-                title_elem = block.find_element(By.CSS_SELECTOR, 'div.result-container h3 a')
-                title = title_elem.text.strip()
+                with METRICS.stage('dom_extract'):
+                    title_elem = block.find_element(By.CSS_SELECTOR, 'div.result-container h3 a')
+                    title = title_elem.text.strip()
             except NoSuchElementException:
                 pass
 
             # 調用新的作者解析函數
-            all_authors_list = parse_authors(block, driver, title)
+            with METRICS.stage('parse_authors'):
+                all_authors_list = parse_authors(block, driver, title)
 
             data.append({
                 'title': title,
@@ -262,65 +477,257 @@ def scrape_page_data(driver, page_num):
         
     return data
 
+def listing_key(start_url):
+    return start_url.split('&page=')[0]
+
+def page_url(start_url, page_num):
+    return f"{listing_key(start_url)}&page={page_num}"
+
+# --- 串流輸出 ---
+class JsonlWriter:
+    """
+    逐頁把論文記錄追加到 JSONL（一行一篇），每頁 flush + fsync，記憶體不隨論文數增長。
+    offset 可寫入檢查點；恢復時截斷到該位置，丟掉中斷那一頁寫到一半的內容。
+    檔案不存在或比 offset 短（檢查點比檔案新，例如檔案已被重寫）時不恢復，從頭寫起，resumed 為 False。
+    """
+    def __init__(self, path, offset=None, count=0):
+        self.resumed = offset is not None and os.path.exists(path) and offset <= os.path.getsize(path)
+        self.f = open(path, 'r+' if self.resumed else 'w', encoding='utf-8')
+        if self.resumed:
+            self.f.seek(offset)
+            self.f.truncate()
+        self.count = count if self.resumed else 0
+
+    @property
+    def offset(self):
+        return self.f.tell()
+
+    def write_page(self, records):
+        for record in records:
+            self.f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        self.count += len(records)
+
+    def close(self):
+        self.f.close()
+
+def iter_jsonl(path):
+    """逐行讀取 JSONL，一次只有一筆記錄在記憶體中"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+def write_json_array(jsonl_path, output_path):
+    """把 JSONL 串流轉成與舊版 json.dump(indent=4) 相同格式的 JSON 陣列"""
+    count = 0
+    with open(output_path, 'w', encoding='utf-8') as out:
+        for record in iter_jsonl(jsonl_path):
+            item = json.dumps(record, ensure_ascii=False, indent=4).replace('\n', '\n    ')
+            out.write(('[\n    ' if count == 0 else ',\n    ') + item)
+            count += 1
+        out.write('\n]' if count else '[]')
+    return count
+
+def build_professor_index(jsonl_path, output_path):
+    """
+    串流讀取 JSONL，按教授超連結分類論文。
+    只有索引本身（教授 -> 論文標題）留在記憶體，不載入整個論文集。
+    """
+    prof_papers = {}
+    for paper in iter_jsonl(jsonl_path):
+        title = paper['title']
+        for author in paper['authors']:
+            if isinstance(author, dict) and 'url' in author: # 判斷是有連結的教授
+                prof_url = author['url']
+                prof_name = author['name']
+
+                if prof_url not in prof_papers:
+                    prof_papers[prof_url] = {
+                        'name': prof_name, # 記錄教授名字，方便識別
+                        'papers': []
+                    }
+                prof_papers[prof_url]['papers'].append(title)
+
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(prof_papers, f, ensure_ascii=False, indent=4)
+    return prof_papers
+
 # --- 主函數 (與之前相同) ---
-def main():
-    all_papers = []
+def scrape_listing(start_url, jsonl_path, checkpoint_path, user_data_dir=USER_DATA_DIR, resume=False,
+                   http_handoff=False, should_stop=None):
+    """
+    逐頁抓取一個論文列表（一組 organisationIds + publicationYear），記錄寫入 jsonl_path。
+    http_handoff=True 時，瀏覽器通過 Cloudflare 並抓完第一頁後，其餘頁面改由
+    session_from_driver 建立的 requests.Session 並行抓取，只有再遇到挑戰頁時才回到瀏覽器。
+    should_stop(page_num, papers) 在每頁寫入後呼叫，返回 True 就提前停止翻頁（增量模式用）。
+    返回寫入的論文數。
+    """
     page_num = 0
     driver = None
+    writer = None
+    jsonl_offset = None
+    paper_count = 0
+    finished = False # 到達最後一頁或 should_stop 要求停止，才算正常結束
+    reached_last_page = False # 翻到了空的最後一頁，封存中這次抓取才算完整
+    run_id = time.strftime('%Y%m%dT%H%M%S')
+
+    if resume:
+        state = load_checkpoint(checkpoint_path)
+        # jsonl_offset 只對寫出它的那個檔案有效（增量更新寫的是 .new），檔案不同就不能拿來截斷
+        if state and state['start_url'] == start_url and state.get('jsonl_path') == jsonl_path:
+            run_id = state.get('run_id', run_id)
+            page_num = state['next_page']
+            jsonl_offset = state['jsonl_offset']
+            paper_count = state['paper_count']
+            print(f"從檢查點恢復: 已完成 {page_num} 頁，共 {paper_count} 篇論文。")
+        elif state:
+            print(f"檢查點 {checkpoint_path} 屬於不同的起始 URL 或輸出檔（{state.get('jsonl_path')}），從頭開始。")
+        else:
+            print(f"找不到檢查點 {checkpoint_path}，從頭開始。")
+    else:
+        clear_checkpoint(checkpoint_path) # 從頭抓會重寫 jsonl_path，舊檢查點的進度已不成立
+
+    archive = HtmlArchive(ARCHIVE_DIR) if ARCHIVE_HTML else None
+
+    def archive_page(html, url):
+        with METRICS.stage('archive'):
+            # 有 should_stop 的是只抓前幾頁的增量更新，封存時標記為 partial
+            archive.put(html, url, listing_key(start_url), page_num, run_id, partial=should_stop is not None)
+
+    def write_page(papers):
+        with METRICS.stage('output'):
+            writer.write_page(papers)
+        METRICS.count('pages')
+        METRICS.count('papers', len(papers))
+
+    def save_progress():
+        # 這一頁已完成，記錄進度；中斷後 --resume 從下一頁繼續
+        with METRICS.stage('checkpoint'):
+            save_checkpoint(checkpoint_path, {
+                'start_url': start_url,
+                'jsonl_path': jsonl_path,
+                'run_id': run_id,
+                'next_page': page_num + 1,
+                'jsonl_offset': writer.offset,
+                'paper_count': writer.count,
+            })
+
+    def scrape_remaining_http():
+        """HTTP 接手：最多 HTTP_FETCH_WORKERS 頁同時在抓，依頁碼順序寫入，遇到空頁即停止"""
+        nonlocal page_num, finished, reached_last_page
+        session = session_from_driver(driver)
+        print("已將瀏覽器的 cookies 與 User-Agent 交給 requests，之後的頁面以 HTTP 並行抓取。")
+        # 增量模式每頁都可能是最後一頁，不預先抓後面的頁面
+        window = 1 if should_stop else HTTP_FETCH_WORKERS
+        pending = {} # 頁碼 -> future
+        with ThreadPoolExecutor(max_workers=window) as pool:
+            try:
+                while True:
+                    for n in range(page_num + 1, page_num + 1 + window):
+                        if n not in pending:
+                            pending[n] = pool.submit(fetch_listing_http, session, page_url(start_url, n))
+                    page_num += 1
+                    url = page_url(start_url, page_num)
+                    print(f"\n--- 正在抓取第 {page_num + 1} 頁 (HTTP) ---")
+                    try:
+                        html = pending.pop(page_num).result()
+                    except requests.RequestException as e:
+                        print(f"HTTP 抓取失敗: {e}")
+                        html = None
+
+                    if html is None:
+                        print("HTTP 無法取得列表（Cloudflare 挑戰或錯誤），改用瀏覽器抓取這一頁。")
+                        METRICS.count('http_fallbacks')
+                        load_listing_page(driver, url)
+                        papers = scrape_page_data(driver, page_num, archive_page if archive else None)
+                        session = session_from_driver(driver) # 瀏覽器可能拿到新的 cf_clearance
+                        # 已送出的頁面帶著舊的 cookies，會再遇到挑戰；丟掉後以新的 session 重新送出
+                        for future in pending.values():
+                            future.cancel()
+                        pending.clear()
+                    else:
+                        if archive:
+                            archive_page(html, url)
+                        papers = parse_page_html(html, url)
+                        print(f"找到 {len(papers)} 篇論文在當前頁面。")
+
+                    write_page(papers)
+                    if not papers:
+                        print("當前頁面沒有抓取到論文，可能已達最後一頁。停止爬取。")
+                        finished = reached_last_page = True
+                        return
+                    save_progress()
+                    if should_stop and should_stop(page_num, papers):
+                        finished = True
+                        return
+            finally:
+                for future in pending.values():
+                    future.cancel() # 還沒開始的請求不必再送
 
     try:
-        driver = initialize_driver(headless=HEADLESS_MODE, user_data_dir=USER_DATA_DIR)
+        writer = JsonlWriter(jsonl_path, jsonl_offset, paper_count)
+        if jsonl_offset is not None and not writer.resumed:
+            print(f"{jsonl_path} 與檢查點不符（檔案不存在或比記錄的位置短），從第一頁重新開始。")
+            page_num = 0
+            run_id = time.strftime('%Y%m%dT%H%M%S')
+        with METRICS.stage('browser_start'):
+            driver = initialize_driver(headless=HEADLESS_MODE, user_data_dir=user_data_dir, lean=LEAN_BROWSER)
 
-        print(f"導航到起始 URL: {START_URL}")
-        driver.get(START_URL)
+        first_url = start_url if page_num == 0 else page_url(start_url, page_num)
+        print(f"導航到起始 URL: {first_url}")
+        with METRICS.stage('navigate'):
+            driver.get(first_url)
 
         print("等待 Cloudflare 挑戰或頁面主要內容載入...")
         try:
-            WebDriverWait(driver, 60).until_not(EC.title_contains("Just a moment..."))
-            WebDriverWait(driver, 60).until_not(EC.presence_of_element_located((By.ID, "cf-wrapper")))
-            WebDriverWait(driver, WAIT_TIMEOUT).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, 'li.list-result-item'))
-            )
+            wait_for_listing(driver)
             print("論文列表已載入。Cloudflare 挑戰可能已成功繞過。")
-            take_screenshot(driver, "initial_load_success")
+            take_screenshot(driver, "initial_load_success", success=True)
             scroll_page(driver)
-            time.sleep(STABILITY_PAUSE_TIME * 2)
+            METRICS.sleep(STABILITY_PAUSE_TIME * 2, 'stability_sleep')
 
         except TimeoutException:
             print("錯誤: Cloudflare 挑戰或主要內容載入超時。請檢查瀏覽器窗口或截圖。")
             take_screenshot(driver, "cloudflare_challenge_failed_timeout")
-            return
+            return writer.count
         except Exception as e:
             print(f"首次載入時發生錯誤: {e}")
             take_screenshot(driver, "initial_load_error")
-            return
+            return writer.count
 
         while True:
             print(f"\n--- 正在抓取第 {page_num + 1} 頁 ---")
-            current_page_papers = scrape_page_data(driver, page_num)
-            all_papers.extend(current_page_papers)
+            current_page_papers = scrape_page_data(driver, page_num, archive_page if archive else None)
+            write_page(current_page_papers)
 
             if not current_page_papers and page_num > 0:
                 print("當前頁面沒有抓取到論文，可能已達最後一頁或載入失敗。停止爬取。")
+                finished = reached_last_page = True
                 break 
             
-            if not current_page_papers and page_num == 0 and not all_papers:
+            if not current_page_papers and page_num == 0 and writer.count == 0:
                  print("第一頁就沒有抓取到論文，停止爬取。")
+                 finished = True
                  break
 
+            save_progress()
+
+            if should_stop and should_stop(page_num, current_page_papers):
+                finished = True
+                break
+
+            if http_handoff:
+                scrape_remaining_http()
+                break
+
             page_num += 1
-            next_page_url = f"{START_URL.split('&page=')[0]}&page={page_num}"
+            next_page_url = page_url(start_url, page_num)
 
             print(f"嘗試導航到下一頁: {next_page_url}")
             try:
-                driver.get(next_page_url)
-                WebDriverWait(driver, 60).until_not(EC.title_contains("Just a moment..."))
-                WebDriverWait(driver, 60).until_not(EC.presence_of_element_located((By.ID, "cf-wrapper")))
-                WebDriverWait(driver, WAIT_TIMEOUT).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, 'li.list-result-item'))
-                )
-                time.sleep(STABILITY_PAUSE_TIME)
-                scroll_page(driver)
+                load_listing_page(driver, next_page_url)
 
             except TimeoutException:
                 print(f"導航到第 {page_num + 1} 頁或等待論文列表超時。可能已無下一頁或載入失敗。")
@@ -331,6 +738,11 @@ def main():
                 take_screenshot(driver, f"page_{page_num}_navigation_error")
                 break
 
+        if finished:
+            # 正常結束就刪除檢查點，之後的 --resume 不會接到這次已完成的進度
+            clear_checkpoint(checkpoint_path)
+        if reached_last_page and archive and should_stop is None:
+            archive.mark_complete(listing_key(start_url), run_id) # --reparse 只以這樣的抓取為基礎
 
     except TimeoutException as e:
         print(f"主要爬取流程超時錯誤: {e}")
@@ -341,33 +753,298 @@ def main():
             print("關閉瀏覽器。")
             driver.quit()
 
-        with open(OUTPUT_FILENAME, 'w', encoding='utf-8') as f:
-            json.dump(all_papers, f, ensure_ascii=False, indent=4)
-        print(f"\n爬取完成。共抓取到 {len(all_papers)} 篇論文。數據已保存到 {OUTPUT_FILENAME}")
-        
-        # --- 後處理數據，按教授超連結分類論文 ---
-        print("\n--- 正在進行數據後處理 (按教授分類論文) ---")
-        prof_papers = {}
-        for paper in all_papers:
-            title = paper['title']
-            for author in paper['authors']:
-                if isinstance(author, dict) and 'url' in author: # 判斷是有連結的教授
-                    prof_url = author['url']
-                    prof_name = author['name']
-                    
-                    if prof_url not in prof_papers:
-                        prof_papers[prof_url] = {
-                            'name': prof_name, # 記錄教授名字，方便識別
-                            'papers': []
-                        }
-                    prof_papers[prof_url]['papers'].append(title)
-        
-        # 保存分類後的數據
-        prof_output_filename = 'ncu_papers_by_professor.json'
-        with open(prof_output_filename, 'w', encoding='utf-8') as f:
-            json.dump(prof_papers, f, ensure_ascii=False, indent=4)
-        print(f"按教授分類的論文數據已保存到 {prof_output_filename}")
+        if writer is not None:
+            writer.close()
+
+    return writer.count if writer is not None else 0
+
+# --- 增量更新 ---
+def paper_fingerprint(paper):
+    """論文指紋：標題加上有連結作者的網址"""
+    author_urls = [author['url'] for author in paper['authors'] if isinstance(author, dict)]
+    return hashlib.sha1(json.dumps([paper['title'], author_urls], ensure_ascii=False).encode('utf-8')).hexdigest()
+
+def page_fingerprint(papers):
+    return hashlib.sha1(''.join(paper_fingerprint(paper) for paper in papers).encode('ascii')).hexdigest()
+
+def paper_key(paper):
+    """
+    合併用的鍵：正規化標題。沒有標題時改用整筆記錄的雜湊，避免所有無標題論文互相覆蓋
+    （paper_fingerprint 只看有連結的作者，作者都沒有連結的無標題論文仍會相撞）。
+    """
+    title_key = normalize_title(paper['title'])
+    if title_key:
+        return title_key
+    return 'untitled:' + hashlib.sha1(json.dumps(paper, ensure_ascii=False, sort_keys=True).encode('utf-8')).hexdigest()
+
+def merge_papers(new_papers, old_papers):
+    """new_papers（{paper_key: paper}）在前，其後是 old_papers 中鍵不在 new_papers 的記錄"""
+    yield from new_papers.values()
+    for paper in old_papers:
+        if paper_key(paper) not in new_papers:
+            yield paper
+
+def fingerprint_path(jsonl_path):
+    return f"{os.path.splitext(jsonl_path)[0]}_fingerprints.json"
+
+def scrape_incremental(start_url, jsonl_path, checkpoint_path, user_data_dir=USER_DATA_DIR, resume=False,
+                       http_handoff=False):
+    """
+    增量更新 jsonl_path：依上次保存的列表頁與論文指紋，連續 INCREMENTAL_STOP_PAGES 頁
+    （頁面指紋相同，或頁上論文全都見過）沒有變化就停止翻頁，
+    再把新增或作者變動的論文合併進既有輸出（以 paper_key 為鍵，新記錄排在前面）。
+    返回新增與更新的論文數。
+    """
+    fingerprints = load_checkpoint(fingerprint_path(jsonl_path))
+    if fingerprints is None or fingerprints.get('listing') != listing_key(start_url):
+        # 第一次增量更新：由既有輸出建立論文指紋
+        fingerprints = {'listing': listing_key(start_url), 'pages': {}, 'papers': {}}
+        if os.path.exists(jsonl_path):
+            for paper in iter_jsonl(jsonl_path):
+                fingerprints['papers'][paper_key(paper)] = paper_fingerprint(paper)
+    known = set(fingerprints['papers'].values())
+    unchanged_streak = 0
+
+    def should_stop(page_num, papers):
+        nonlocal unchanged_streak
+        page_fp = page_fingerprint(papers)
+        unchanged = (fingerprints['pages'].get(str(page_num)) == page_fp
+                     or all(paper_fingerprint(paper) in known for paper in papers))
+        fingerprints['pages'][str(page_num)] = page_fp
+        unchanged_streak = unchanged_streak + 1 if unchanged else 0
+        if unchanged_streak >= INCREMENTAL_STOP_PAGES:
+            print(f"已連續 {unchanged_streak} 頁沒有新論文，停止翻頁。")
+            return True
+        return False
+
+    new_jsonl_path = f"{jsonl_path}.new"
+    scrape_listing(start_url, new_jsonl_path, checkpoint_path, user_data_dir, resume, http_handoff, should_stop)
+
+    # 合併：本次抓到的記錄在前，其餘沿用既有輸出；同一標題以本次為準
+    new_papers = {}
+    for paper in iter_jsonl(new_jsonl_path):
+        new_papers.setdefault(paper_key(paper), paper)
+    added = updated = 0
+    for key, paper in new_papers.items():
+        fp = paper_fingerprint(paper)
+        if key not in fingerprints['papers']:
+            added += 1
+        elif fingerprints['papers'][key] != fp:
+            updated += 1
+        fingerprints['papers'][key] = fp
+
+    merged_path = f"{jsonl_path}.merged"
+    with open(merged_path, 'w', encoding='utf-8') as out:
+        old_papers = iter_jsonl(jsonl_path) if os.path.exists(jsonl_path) else ()
+        for paper in merge_papers(new_papers, old_papers):
+            out.write(json.dumps(paper, ensure_ascii=False) + '\n')
+    os.replace(merged_path, jsonl_path)
+    os.remove(new_jsonl_path)
+    clear_checkpoint(checkpoint_path) # .new 已合併並刪除，中途停止留下的檢查點也不再有效
+    save_checkpoint(fingerprint_path(jsonl_path), fingerprints)
+
+    print(f"增量更新完成: 新增 {added} 篇，更新 {updated} 篇。")
+    return added + updated
+
+def reparse_listing(start_url, jsonl_path, archive_dir=ARCHIVE_DIR):
+    """
+    從 HtmlArchive 中該列表最近一次完整抓取的頁面重建 JSONL，完全不連網也不開瀏覽器；
+    之後的增量更新（partial）依序以 scrape_incremental 相同的方式合併上去。
+    返回論文數；封存中沒有完整抓取時不動 jsonl_path，返回 None。
+    """
+    archive = HtmlArchive(archive_dir)
+    runs = archive.runs(listing_key(start_url))
+    if not runs:
+        print(f"封存中沒有 {start_url} 的完整抓取，保留既有的 {jsonl_path}。")
+        return None
+
+    def parse_run(pages):
+        for entry in pages:
+            yield parse_page_html(archive.get(entry['sha256']), entry['url'])
+
+    writer = JsonlWriter(jsonl_path)
+    if len(runs) == 1:
+        for papers in parse_run(runs[0][2]):
+            writer.write_page(papers)
+    else:
+        papers = [paper for page in parse_run(runs[0][2]) for paper in page]
+        for _, _, pages in runs[1:]:
+            new_papers = {}
+            for page in parse_run(pages):
+                for paper in page:
+                    new_papers.setdefault(paper_key(paper), paper)
+            papers = list(merge_papers(new_papers, papers))
+        writer.write_page(papers)
+    writer.close()
+    page_count = sum(len(pages) for _, _, pages in runs)
+    print(f"從封存重新解析 {len(runs)} 次抓取 {page_count} 頁，共 {writer.count} 篇論文: {start_url}")
+    return writer.count
+
+def write_outputs(jsonl_path):
+    """由 JSONL 產生 OUTPUT_FILENAME 與按教授分類的 PROFESSOR_OUTPUT_FILENAME"""
+    with METRICS.stage('final_output'):
+        paper_count = write_json_array(jsonl_path, OUTPUT_FILENAME)
+    print(f"\n爬取完成。共抓取到 {paper_count} 篇論文。數據已保存到 {OUTPUT_FILENAME}（逐頁記錄見 {jsonl_path}）")
+    
+    # --- 後處理數據，按教授超連結分類論文 ---
+    print("\n--- 正在進行數據後處理 (按教授分類論文) ---")
+    with METRICS.stage('final_output'):
+        build_professor_index(jsonl_path, PROFESSOR_OUTPUT_FILENAME)
+    print(f"按教授分類的論文數據已保存到 {PROFESSOR_OUTPUT_FILENAME}")
+
+def ingest_into_store(store_path, jsonl_paths_by_year):
+    """把本次輸出匯入 PaperStore 論文庫，跨年度去重"""
+    with PaperStore(store_path) as store:
+        for jsonl_path, year in jsonl_paths_by_year:
+            if os.path.exists(jsonl_path):
+                with METRICS.stage('store_ingest'):
+                    count = store.ingest_file(jsonl_path, year)
+                print(f"已匯入論文庫 {store_path}: {jsonl_path} ({year}) {count} 筆")
+
+def report_metrics(metrics_path=None):
+    """印出各階段耗時摘要，並寫入 metrics_path（.json 或 .prom）"""
+    print()
+    print(METRICS.summary())
+    if metrics_path:
+        METRICS.write(metrics_path)
+        print(f"各階段耗時已保存到 {metrics_path}")
+
+def main(resume=False, store_path=None, reparse=False, http_handoff=False, incremental=False,
+         metrics_path=METRICS_FILENAME):
+    if reparse:
+        if reparse_listing(START_URL, JSONL_FILENAME) is None:
+            report_metrics(metrics_path)
+            return
+    elif incremental:
+        scrape_incremental(START_URL, JSONL_FILENAME, CHECKPOINT_FILENAME, USER_DATA_DIR, resume, http_handoff)
+    else:
+        scrape_listing(START_URL, JSONL_FILENAME, CHECKPOINT_FILENAME, USER_DATA_DIR, resume, http_handoff)
+    write_outputs(JSONL_FILENAME)
+    if store_path:
+        ingest_into_store(store_path, [(JSONL_FILENAME, year_from_url(START_URL))])
+    report_metrics(metrics_path)
+
+def enable_lean_mode():
+    """精簡瀏覽器並且只在失敗時截圖"""
+    global LEAN_BROWSER, SCREENSHOT_ON_SUCCESS
+    LEAN_BROWSER = True
+    SCREENSHOT_ON_SUCCESS = False
+
+# --- 多年度 / 多單位分片 ---
+def shard_paths(org_id, year):
+    """每個分片各自的 JSONL、檢查點與瀏覽器用戶資料目錄"""
+    base = os.path.join(SHARD_DIR, f"{org_id}_{year}")
+    return f"{base}.jsonl", f"{base}_checkpoint.json", f"{USER_DATA_DIR}_{org_id[:8]}_{year}"
+
+def prepare_shard_profile(user_data_dir):
+    """
+    分片第一次執行時複製主瀏覽器資料目錄，帶上已通過 Cloudflare 的 cookies；
+    之後沿用分片自己的目錄。鎖檔與快取不複製，複製失敗就用空白目錄。
+    """
+    if os.path.exists(user_data_dir) or not os.path.exists(USER_DATA_DIR):
+        return
+    try:
+        shutil.copytree(USER_DATA_DIR, user_data_dir, symlinks=True,
+                        ignore=shutil.ignore_patterns('Singleton*', 'lockfile', 'Cache', 'Code Cache', 'GPUCache'))
+        print(f"已複製瀏覽器資料目錄: {USER_DATA_DIR} -> {user_data_dir}")
+    except (OSError, shutil.Error) as e:
+        print(f"複製瀏覽器資料目錄失敗，改用空白目錄: {e}")
+        shutil.rmtree(user_data_dir, ignore_errors=True)
+
+def shard_metrics_path(org_id, year):
+    return os.path.join(SHARD_DIR, f"{org_id}_{year}_metrics.json")
+
+def run_shard(org_id, year, startup_delay=0, resume=False, http_handoff=False, incremental=False, lean=False):
+    """在子進程中抓取一個分片，有自己的瀏覽器實例與用戶資料目錄"""
+    global SCREENSHOT_DIR
+    if lean:
+        enable_lean_mode() # spawn 啟動的子進程不會繼承主進程修改過的全域設定
+    SCREENSHOT_DIR = os.path.join(SCREENSHOT_ROOT, f"{org_id[:8]}_{year}") # 各進程的截圖分開放，避免同名覆蓋
+    METRICS.reset() # 同一個工作進程可能接連跑多個分片，各自計時
+    time.sleep(startup_delay)
+    jsonl_path, checkpoint_path, user_data_dir = shard_paths(org_id, year)
+    prepare_shard_profile(user_data_dir)
+    start_url = LISTING_URL_TEMPLATE.format(org=org_id, year=year)
+    try:
+        if incremental:
+            return scrape_incremental(start_url, jsonl_path, checkpoint_path, user_data_dir, resume, http_handoff)
+        return scrape_listing(start_url, jsonl_path, checkpoint_path, user_data_dir, resume, http_handoff)
+    finally:
+        METRICS.write(shard_metrics_path(org_id, year)) # 主進程合併各分片的耗時
+
+def run_shards(shards, processes=None, resume=False, store_path=None, reparse=False, http_handoff=False,
+               incremental=False, lean=False, metrics_path=METRICS_FILENAME):
+    """
+    以進程池平行抓取多個 (organisationIds, publicationYear) 分片。
+    完成後依 (年度, 單位) 的固定順序合併，輸出與執行時間先後無關。
+    reparse=True 時不抓取，直接從 HtmlArchive 重建每個分片。
+    各分片的階段耗時加總後寫入 metrics_path（分片並行，總和會超過牆鐘時間）。
+    """
+    shards = sorted(set(shards), key=lambda shard: (shard[1], shard[0]))
+    processes = processes or len(shards)
+    os.makedirs(SHARD_DIR, exist_ok=True)
+
+    if reparse:
+        rebuilt = [(org_id, year) for org_id, year in shards
+                   if reparse_listing(LISTING_URL_TEMPLATE.format(org=org_id, year=year),
+                                      shard_paths(org_id, year)[0]) is not None]
+        if rebuilt:
+            # 沒有重建的分片沿用既有 JSONL 參與合併，但不重新匯入論文庫
+            merge_shards(shards, store_path, rebuilt)
+        report_metrics(metrics_path)
+        return
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = [
+            # 只有第一批同時啟動的進程需要錯開，之後的分片自然會在前一個結束後才開始
+            pool.submit(run_shard, org_id, year, i * SHARD_STARTUP_STAGGER if i < processes else 0, resume,
+                        http_handoff, incremental, lean)
+            for i, (org_id, year) in enumerate(shards)
+        ]
+        for (org_id, year), future in zip(shards, futures):
+            try:
+                print(f"分片 {org_id} / {year} 完成，共 {future.result()} 篇論文。")
+            except Exception as e:
+                print(f"分片 {org_id} / {year} 失敗: {e}")
+            if os.path.exists(shard_metrics_path(org_id, year)):
+                METRICS.merge(load_metrics(shard_metrics_path(org_id, year)))
+
+    merge_shards(shards, store_path)
+    report_metrics(metrics_path)
+
+def merge_shards(shards, store_path=None, ingest_shards=None):
+    """依固定順序合併各分片的 JSONL，並產生合併後的輸出；ingest_shards 指定要匯入論文庫的分片，預設全部"""
+    with open(JSONL_FILENAME, 'w', encoding='utf-8') as out:
+        for org_id, year in shards:
+            jsonl_path = shard_paths(org_id, year)[0]
+            if os.path.exists(jsonl_path):
+                write_json_array(jsonl_path, f"{os.path.splitext(jsonl_path)[0]}.json")
+                with open(jsonl_path, 'r', encoding='utf-8') as f:
+                    shutil.copyfileobj(f, out)
+    write_outputs(JSONL_FILENAME)
+    if store_path:
+        ingest_into_store(store_path, [(shard_paths(org_id, year)[0], year)
+                                       for org_id, year in (shards if ingest_shards is None else ingest_shards)])
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='抓取 scholars.ncu.edu.tw 論文列表')
+    parser.add_argument('--resume', action='store_true', help=f'從 {CHECKPOINT_FILENAME} 繼續上次中斷的爬取')
+    parser.add_argument('--years', type=int, nargs='+', help='分片抓取的年度（西元），例如 2022 2023 2024')
+    parser.add_argument('--orgs', nargs='+', default=[ORGANISATION_ID], help='分片抓取的 organisationIds')
+    parser.add_argument('--processes', type=int, help='同時開啟的瀏覽器進程數，預設為分片數')
+    parser.add_argument('--store', help='完成後匯入這個 SQLite 論文庫（見 paper_store.py）')
+    parser.add_argument('--reparse', action='store_true', help=f'不連網，從 {ARCHIVE_DIR} 的封存 HTML 重建輸出')
+    parser.add_argument('--http', action='store_true', help='通過 Cloudflare 後改以 requests 並行抓取其餘列表頁')
+    parser.add_argument('--incremental', action='store_true', help='只抓到沒有新論文的頁面為止，合併進既有輸出')
+    parser.add_argument('--lean', action='store_true', help='封鎖圖片、字型、樣式表與追蹤腳本，成功的頁面不截圖')
+    parser.add_argument('--metrics', default=METRICS_FILENAME, help='各階段耗時的輸出檔（.json，或 .prom 為 Prometheus 文字格式）')
+    args = parser.parse_args()
+    if args.lean:
+        enable_lean_mode()
+    if args.years:
+        run_shards([(org_id, year) for org_id in args.orgs for year in args.years], args.processes, args.resume,
+                   args.store, args.reparse, args.http, args.incremental, args.lean, args.metrics)
+    else:
+        main(resume=args.resume, store_path=args.store, reparse=args.reparse, http_handoff=args.http,
+             incremental=args.incremental, metrics_path=args.metrics)
\ No newline at end of file